@@ -1,15 +1,65 @@
 import os
+import time
 import shutil
-import pandas as pd
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.utils import secure_filename
-from utils import pdfs_to_cleaned_and_extracted_excel
-from flask import Flask, render_template, request, redirect, url_for, send_file, jsonify
+from werkzeug.http import parse_options_header
+from utils import pdfs_to_cleaned_and_extracted_excel, materialize_excel, open_results_store, extract_text_from_file, load_document, find_job_files
+from cleaning import clean_text
+from jobs import JobManager
+from resume_index import ResumeIndex
+from results_store import SORT_COLUMNS
+from uploads import BlobStore, ResumeIntake
+from flask import Flask, render_template, request, redirect, url_for, send_file, jsonify, Response, stream_with_context
 
 app = Flask(__name__)
 app.config['MAIN_DIR'] = 'data'
 app.config['UPLOAD_FOLDER'] = os.path.join(app.config['MAIN_DIR'], 'uploads')
 app.config['RESUME_FOLDER'] = os.path.join(app.config['MAIN_DIR'], "resumes")
+# Uploaded resumes stored once per content; the resume folder links to them by file name
+app.config['BLOB_FOLDER'] = os.path.join(app.config['MAIN_DIR'], 'blobs')
 app.config['PROCESSED_FOLDER'] = os.path.join(app.config['MAIN_DIR'], 'processed')
+# Worker pool sizes for screening: PDF parsing processes and concurrent LLM requests
+app.config['PARSE_WORKERS'] = int(os.environ.get('PARSE_WORKERS', 1))
+app.config['LLM_WORKERS'] = int(os.environ.get('LLM_WORKERS', 1))
+# Send the three per-resume prompts concurrently (pair with OLLAMA_NUM_PARALLEL on the Ollama server)
+app.config['ASYNC_LLM'] = os.environ.get('ASYNC_LLM', '0') == '1'
+# Ask for all fields in one JSON-mode call per resume instead of three prompts
+app.config['SINGLE_PASS'] = os.environ.get('SINGLE_PASS', '0') == '1'
+# Pre-filter: only the PREFILTER_TOP_K resumes most similar to the job description and/or those
+# scoring at least PREFILTER_THRESHOLD go through the LLM stages (unset = screen everything)
+app.config['PREFILTER_TOP_K'] = int(os.environ.get('PREFILTER_TOP_K', 0)) or None
+app.config['PREFILTER_THRESHOLD'] = float(os.environ['PREFILTER_THRESHOLD']) if os.environ.get('PREFILTER_THRESHOLD') else None
+# Largest page of results /api/profiles returns at once
+app.config['PROFILES_PAGE_LIMIT'] = 500
+# Most resumes /api/resumes/search returns at once
+app.config['SEARCH_TOP_N_LIMIT'] = 100
+
+# Screening runs in the background; the request only starts a job
+job_manager = JobManager()
+# Chunk embeddings of every uploaded resume, kept on disk so any job description can be ranked
+# against the whole pool without re-parsing or re-embedding it
+resume_index = ResumeIndex(os.path.join(app.config['MAIN_DIR'], 'index'))
+results_excel_path = os.path.join(app.config['PROCESSED_FOLDER'], 'processed_profiles.xlsx')
+blob_store = BlobStore(app.config['BLOB_FOLDER'])
+# Extracts the text of each resume as soon as it is uploaded, so screening finds it in the text cache
+warmup_pool = ThreadPoolExecutor(max_workers=max(1, app.config['PARSE_WORKERS']), thread_name_prefix='warmup')
+
+# Modification time of the resume folder when the index was last brought up to date
+resume_folder_synced_mtime = None
+
+def resume_folder_mtime():
+    return os.stat(app.config['RESUME_FOLDER']).st_mtime_ns if os.path.isdir(app.config['RESUME_FOLDER']) else None
+
+def refresh_resume_index():
+    # Indexes new uploads in the background; unchanged files are skipped
+    global resume_folder_synced_mtime
+    resume_folder_synced_mtime = resume_folder_mtime()
+    threading.Thread(target=resume_index.sync, args=(app.config['RESUME_FOLDER'],), daemon=True).start()
+
+def warm_text_cache(file_path, digest):
+    warmup_pool.submit(load_document, file_path, digest=digest)
 
 # Function to clear the folder if it already exists
 def clear_folder(folder_path):
@@ -34,23 +84,19 @@ if not os.path.exists(app.config['RESUME_FOLDER']):
     os.makedirs(app.config['RESUME_FOLDER'])
 
 
+def render_results(role=None):
+    # Results page for all rows or one role. Only the role list is rendered here; the table
+    # fetches its rows page by page from /api/profiles.
+    store = open_results_store(results_excel_path)
+    if not store.count():
+        return render_template('selected_profiles.html')
+    roles_data = ['All Rows'] + store.roles()
+    selected_role = role if role != 'All Rows' else None
+    return render_template('selected_profiles.html', xls_file='processed_profiles.xlsx', roles_data=roles_data, selected_role=selected_role)
+
 @app.route('/')
 def index():
-    
-    if len(os.listdir(app.config['PROCESSED_FOLDER']))>=1:
-        xls_file_path = os.path.join(app.config['PROCESSED_FOLDER'], 'processed_profiles.xlsx')
-    
-        # Read the processed XLS file and convert it to HTML
-        df = pd.read_excel(xls_file_path)
-        table_data = df.to_html(classes='table table-striped', index=False)
-        
-        roles_data = sorted(list(set(df['Role'])))
-        roles_data.insert(0, 'All Rows')
-        app.config['ROLES'] = roles_data
-
-        return render_template('selected_profiles.html', xls_file='processed_profiles.xlsx', table_data=table_data, roles_data=roles_data)
-    
-    return render_template('selected_profiles.html')
+    return render_results()
 
 @app.route('/job_desc')
 def job_desc():
@@ -68,19 +114,7 @@ def job_desc():
 
 @app.route('/selected_profiles')
 def selected_profiles():
-    if len(os.listdir(app.config['PROCESSED_FOLDER']))>=1:
-        xls_file_path = os.path.join(app.config['PROCESSED_FOLDER'], 'processed_profiles.xlsx')
-    
-        # Read the processed XLS file and convert it to HTML
-        df = pd.read_excel(xls_file_path)
-        table_data = df.to_html(classes='table table-striped', index=False)
-        
-        roles_data = sorted(list(set(df['Role'])))
-        roles_data.insert(0, 'All Rows')
-        app.config['ROLES'] = roles_data
-        
-        return render_template('selected_profiles.html', xls_file='processed_profiles.xlsx', table_data=table_data, roles_data=roles_data)
-    return render_template('selected_profiles.html')  # Render the selected profiles page
+    return render_results()  # Render the selected profiles page
 
 @app.route('/upload_resumes')
 def upload_resumes():
@@ -89,20 +123,25 @@ def upload_resumes():
 
 @app.route('/upload', methods=['POST'])
 def upload_resume_files():
-    # Intake Files
-    resumes_files = request.files.getlist('resumes')  # Handle multiple resumes
+    # The body is read as a stream instead of through request.files, which would buffer every
+    # file first. Resumes and zip archives of resumes are stored as their bytes arrive.
+    content_type, options = parse_options_header(request.content_type)
+    if content_type != 'multipart/form-data' or 'boundary' not in options:
+        return redirect(request.url)
+
+    intake = ResumeIntake(blob_store, app.config['RESUME_FOLDER'], on_file=warm_text_cache)
+    try:
+        summary = intake.consume(request.stream, options['boundary'].encode('latin-1'))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
 
     # Ensure files are uploaded
-    if not resumes_files:
+    if not summary['saved'] and not summary['duplicates']:
         return redirect(request.url)
 
-    # Save each resume
-    resume_paths = []
-    for resume_file in resumes_files:
-        resume_path = os.path.join(app.config['RESUME_FOLDER'], secure_filename(resume_file.filename))
-        resume_file.save(resume_path)
-        resume_paths.append(resume_path)
-
+    refresh_resume_index()
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({"status": "success", **summary})
     return render_template('selected_profiles.html')
 
 @app.route('/job_desc', methods=['GET', 'POST'])
@@ -145,51 +184,87 @@ def upload_files():
 @app.route('/download/<filename>')
 def download_file(filename):
     file_path = os.path.join(app.config['PROCESSED_FOLDER'], filename)
+    # Results are kept in an append-only store; write out the workbook only when it is asked for
+    materialize_excel(file_path)
     response = send_file(file_path, as_attachment=True)
     clear_folder(app.config['PROCESSED_FOLDER'])
     return response
 
-@app.route('/process_data', methods=['POST'])
-def process_data():
-
-    job_description_path, eval_template_path = None, None
-    for file_name in os.listdir(app.config['UPLOAD_FOLDER']):
-
-        if file_name.endswith('.txt'):
-            job_description_path = os.path.join(app.config['UPLOAD_FOLDER'],file_name)
-        if file_name.endswith('.xlsx'):
-            eval_template_path = os.path.join(app.config['UPLOAD_FOLDER'],file_name)
+def find_job_inputs():
+    job_description_path, eval_template_path = find_job_files(app.config['UPLOAD_FOLDER'])
 
     # If either path is None, handle the error
     if not job_description_path or not eval_template_path:
-        error_message = "Job Description or Evaluation Template is not uploaded."
-        return render_template('selected_profiles.html', error_message=error_message)
+        return None, None, "Job Description or Evaluation Template is not uploaded."
     
     if len(os.listdir(app.config['RESUME_FOLDER']))<=0:
-        error_message = "Resumes not uploaded."
-        return render_template('selected_profiles.html', error_message=error_message)
-    
+        return None, None, "Resumes not uploaded."
+
+    return job_description_path, eval_template_path, None
+
+def start_screening_job(job_description_path, eval_template_path):
     xls_file_path = os.path.join(app.config['PROCESSED_FOLDER'], 'processed_profiles.xlsx')
 
-    
-    # Process the resumes and generate the XLS file
-    pdfs_to_cleaned_and_extracted_excel(app.config['RESUME_FOLDER'], job_description_path, eval_template_path, final_excel_path=xls_file_path)
+    # Process the resumes on a worker thread; results are appended to the store as they finish
+    return job_manager.submit(
+        pdfs_to_cleaned_and_extracted_excel, app.config['RESUME_FOLDER'], job_description_path, eval_template_path,
+        final_excel_path=xls_file_path, parse_workers=app.config['PARSE_WORKERS'], llm_workers=app.config['LLM_WORKERS'],
+        use_async=app.config['ASYNC_LLM'], single_pass=app.config['SINGLE_PASS'],
+        prefilter_top_k=app.config['PREFILTER_TOP_K'], prefilter_threshold=app.config['PREFILTER_THRESHOLD'],
+    )
 
-    # Read the processed XLS file and convert it to HTML
-    df = pd.read_excel(xls_file_path)
-    table_data = df.to_html(classes='table table-striped', index=False)
-    
-    # Render the same page but now with the table data and XLS file available for download
-    roles_data = sorted(list(set(df['Role'])))  # Remove duplicates and sort the roles
-    roles_data.insert(0, 'All Rows')  # Ensure "All Rows" is always the first option
-    app.config['ROLES'] = roles_data  # Save roles in app config
-    return render_template('selected_profiles.html', xls_file='processed_profiles.xlsx', table_data=table_data, roles_data=roles_data)
+@app.route('/process_data', methods=['POST'])
+def process_data():
+    job_description_path, eval_template_path, error_message = find_job_inputs()
+    if error_message:
+        return render_template('selected_profiles.html', error_message=error_message)
+
+    job = start_screening_job(job_description_path, eval_template_path)
+
+    # Render the page straight away; it follows the job's progress stream and reloads when done
+    return render_template('selected_profiles.html', job_id=job.id)
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    job_description_path, eval_template_path, error_message = find_job_inputs()
+    if error_message:
+        return jsonify({"status": "error", "message": error_message}), 400
+
+    job = start_screening_job(job_description_path, eval_template_path)
+    return jsonify({
+        "job_id": job.id,
+        "status_url": url_for('job_status', job_id=job.id),
+        "events_url": url_for('job_events', job_id=job.id),
+    }), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job."}), 404
+    # completed_files is paged with ?files_offset=0&files_limit=500; completed_count is the total
+    try:
+        files_offset = max(0, int(request.args.get('files_offset', 0)))
+        files_limit = min(max(1, int(request.args.get('files_limit', app.config['PROFILES_PAGE_LIMIT']))), app.config['PROFILES_PAGE_LIMIT'])
+    except ValueError:
+        return jsonify({"status": "error", "message": "files_offset and files_limit must be numbers."}), 400
+    return jsonify(job.to_dict(files_offset, files_limit))
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job."}), 404
+    return Response(stream_with_context(job.events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 # Clear uploads route
 @app.route('/clear_uploads', methods=['POST'])
 def clear_uploads():
     try:
         clear_folder(app.config['RESUME_FOLDER'])
+        clear_folder(app.config['BLOB_FOLDER'])
+        resume_index.sync(app.config['RESUME_FOLDER'])
         return jsonify({"status": "success", "message": "Uploads cleared successfully!"}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -217,20 +292,81 @@ def clear_jobdesc_skills():
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/api/resumes/search', methods=['GET', 'POST'])
+def search_resumes():
+    # Top resumes in the index for a job description: the "job_description" text of a JSON body,
+    # or else the uploaded job description file
+    payload = request.get_json(silent=True) or {}
+    try:
+        top_n = min(max(1, int(payload.get('top_n') or request.args.get('top_n', 10))), app.config['SEARCH_TOP_N_LIMIT'])
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "top_n must be a number."}), 400
+
+    if payload.get('job_description'):
+        job_description = clean_text(payload['job_description'])
+    else:
+        job_description_files = [file_name for file_name in os.listdir(app.config['UPLOAD_FOLDER']) if file_name.endswith('.txt')]
+        if not job_description_files:
+            return jsonify({"status": "error", "message": "Job Description is not uploaded."}), 400
+        job_description = extract_text_from_file(os.path.join(app.config['UPLOAD_FOLDER'], job_description_files[0]))
+
+    # Searches the index as it is now. Files added or removed outside the upload route (the folder
+    # changed since the last sync) are picked up by a background sync for later searches.
+    if resume_folder_mtime() != resume_folder_synced_mtime:
+        refresh_resume_index()
+
+    start_time = time.time()
+    results = resume_index.search(job_description, top_n=top_n)
+    return jsonify({
+        "status": "success",
+        "results": results,
+        "took_ms": round((time.time() - start_time) * 1000, 2),
+        "index": resume_index.stats(),
+    })
+
+@app.route('/api/profiles')
+def api_profiles():
+    # One page of screening results from the indexed results store, e.g.
+    # ?offset=0&limit=50&sort=Score&order=desc&role=Data Scientist&min_score=60&max_score=100&columns=Name,Score
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(max(1, int(request.args.get('limit', 50))), app.config['PROFILES_PAGE_LIMIT'])
+        min_score = float(request.args['min_score']) if request.args.get('min_score') else None
+        max_score = float(request.args['max_score']) if request.args.get('max_score') else None
+    except ValueError:
+        return jsonify({"status": "error", "message": "offset, limit, min_score and max_score must be numbers."}), 400
+
+    sort = request.args.get('sort') or None
+    if sort is not None and sort not in SORT_COLUMNS:
+        return jsonify({"status": "error", "message": f"sort must be one of {', '.join(SORT_COLUMNS)}."}), 400
+    order = request.args.get('order', 'desc')
+    if order not in ('asc', 'desc'):
+        return jsonify({"status": "error", "message": "order must be asc or desc."}), 400
+
+    role = request.args.get('role') or None
+    if role == 'All Rows':
+        role = None
+    columns = [column.strip() for column in request.args.get('columns', '').split(',') if column.strip()] or None
+
+    total, rows = open_results_store(results_excel_path).query(
+        offset=offset, limit=limit, sort=sort, descending=order == 'desc', role=role,
+        min_score=min_score, max_score=max_score, columns=columns,
+    )
+    return jsonify({
+        "status": "success",
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        # JSON objects do not keep their key order, so the column order is sent separately
+        "columns": columns or list(dict.fromkeys(column for row in rows for column in row)),
+        "rows": rows,
+    })
+
 
 @app.route('/filter_by_role', methods=['POST'])
 def filter_by_role():
     selected_role = request.form.get('role')
-    xls_file_path = os.path.join(app.config['PROCESSED_FOLDER'], 'processed_profiles.xlsx')
-    filtered_profiles = pd.read_excel(xls_file_path)
-
-    if selected_role!="All Rows":
-        filtered_profiles = filtered_profiles[filtered_profiles['Role'] == selected_role]
-        
-    table_data = filtered_profiles.to_html(classes='table table-striped', index=False)
-
-    # Pass the filtered data to the template
-    return render_template('selected_profiles.html', xls_file='processed_profiles.xlsx', table_data=table_data, roles_data=app.config['ROLES'])
+    return render_results(selected_role)
 
 
 if __name__ == "__main__":
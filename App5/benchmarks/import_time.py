@@ -0,0 +1,90 @@
+# Measures cold-start import time of the app modules with `python -X importtime`, checks it
+# against a budget and appends the result to import_time_history.csv so regressions show up
+# over time.
+#
+#   python benchmarks/import_time.py [--runs 5] [--no-record]
+#
+# Exits with status 1 when a module is over its budget.
+import os
+import re
+import sys
+import csv
+import argparse
+import subprocess
+from datetime import datetime, timezone
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'import_time_history.csv')
+
+# Cold-start budgets in milliseconds
+BUDGETS_MS = {
+    'utils': 250,
+    'app': 600,
+}
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure(module):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=APP_DIR, capture_output=True, text=True, check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            imports.append((match.group(4), len(match.group(3)), int(match.group(2))))
+
+    # The module itself is the last top-level entry; its cumulative time covers everything it pulled in
+    total_us = next(cumulative for name, depth, cumulative in reversed(imports) if name == module and depth == 1)
+    heaviest = sorted((entry for entry in imports if entry[1] == 3), key=lambda entry: -entry[2])[:8]
+    return total_us / 1000, heaviest
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def record(rows):
+    new_file = not os.path.exists(HISTORY_PATH)
+    with open(HISTORY_PATH, 'a', newline='') as file:
+        writer = csv.writer(file)
+        if new_file:
+            writer.writerow(['timestamp', 'revision', 'python', 'module', 'best_ms', 'budget_ms'])
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check cold-start import time against its budget.')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--no-record', action='store_true', help='do not append to the history file')
+    args = parser.parse_args()
+
+    timestamp = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    python_version = '.'.join(map(str, sys.version_info[:3]))
+    revision = git_revision()
+    rows, over_budget = [], []
+
+    for module, budget_ms in BUDGETS_MS.items():
+        runs = [measure(module) for _ in range(args.runs)]
+        best_ms, heaviest = min(runs, key=lambda run: run[0])
+        status = 'OK' if best_ms <= budget_ms else 'OVER BUDGET'
+        print(f"{module}: {best_ms:.1f} ms (budget {budget_ms} ms) {status}")
+        for name, _, cumulative_us in heaviest:
+            print(f"    {cumulative_us / 1000:8.1f} ms  {name}")
+        rows.append([timestamp, revision, python_version, module, f"{best_ms:.1f}", budget_ms])
+        if best_ms > budget_ms:
+            over_budget.append(module)
+
+    if not args.no_record:
+        record(rows)
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == '__main__':
+    main()
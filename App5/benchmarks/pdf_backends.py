@@ -0,0 +1,54 @@
+# Compares PDF text extraction throughput of the pdfium and pdfplumber backends.
+#
+#   python benchmarks/pdf_backends.py [resume_folder] [--limit N]
+#
+# The text cache is bypassed so every file is really parsed by each backend.
+import os
+import sys
+import time
+import argparse
+
+os.environ['TEXT_CACHE'] = '0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import read_pdf, read_pdf_pdfium, read_pdf_pdfplumber, looks_degenerate
+
+
+def run(files, reader):
+    pages, characters = 0, 0
+    start_time = time.perf_counter()
+    for file_path in files:
+        pdf = reader(file_path)
+        pages += len(pdf["pages"])
+        characters += len(pdf["text"])
+    return time.perf_counter() - start_time, pages, characters
+
+
+def main():
+    default_folder = os.path.join(os.path.dirname(__file__), '..', '..', 'Resumes')
+    parser = argparse.ArgumentParser(description='Compare PDF text extraction backends.')
+    parser.add_argument('resume_folder', nargs='?', default=default_folder)
+    parser.add_argument('--limit', type=int, default=None)
+    args = parser.parse_args()
+
+    files = sorted(
+        os.path.join(args.resume_folder, filename)
+        for filename in os.listdir(args.resume_folder) if filename.lower().endswith('.pdf')
+    )[:args.limit]
+
+    fallbacks = sum(looks_degenerate(read_pdf_pdfium(file_path)["text"]) for file_path in files)
+    print(f"{len(files)} PDFs, {fallbacks} would fall back from pdfium to pdfplumber\n")
+
+    backends = [
+        ('pdfplumber', read_pdf_pdfplumber),
+        ('pdfium (raw)', read_pdf_pdfium),
+        ('pdfium + fallback', lambda file_path: read_pdf(file_path, backend='pdfium')),
+    ]
+    print(f"{'backend':<20}{'seconds':>10}{'files/s':>10}{'pages/s':>10}{'chars':>12}")
+    for name, reader in backends:
+        elapsed, pages, characters = run(files, reader)
+        print(f"{name:<20}{elapsed:>10.2f}{len(files) / elapsed:>10.1f}{pages / elapsed:>10.1f}{characters:>12}")
+
+
+if __name__ == '__main__':
+    main()
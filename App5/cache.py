@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+class SQLiteCache:
+    # Base class for the on-disk caches: one connection per thread (and per process,
+    # since the parse pool forks), created lazily so importing this module is free.
+    schema = ""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(self.schema)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+
+class LLMCache(SQLiteCache):
+    # Content-addressed store of LLM responses keyed by (model, prompt template id, rendered prompt hash).
+    # Evicts least recently used entries once the stored responses exceed max_bytes. cache_size
+    # keeps the total size, updated by triggers in the same transaction as each write, so a put
+    # only reads one row instead of summing the table.
+    schema = """
+    CREATE TABLE IF NOT EXISTS responses (
+        key TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        template_id TEXT NOT NULL,
+        response TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        last_access REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+    CREATE TABLE IF NOT EXISTS cache_size (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        total INTEGER NOT NULL
+    );
+    CREATE TRIGGER IF NOT EXISTS responses_insert_size AFTER INSERT ON responses BEGIN
+        UPDATE cache_size SET total = total + new.size;
+    END;
+    CREATE TRIGGER IF NOT EXISTS responses_update_size AFTER UPDATE OF size ON responses BEGIN
+        UPDATE cache_size SET total = total + new.size - old.size;
+    END;
+    CREATE TRIGGER IF NOT EXISTS responses_delete_size AFTER DELETE ON responses BEGIN
+        UPDATE cache_size SET total = total - old.size;
+    END;
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, enabled=True):
+        super().__init__(path)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_name, template_id, rendered_prompt):
+        digest = hashlib.sha256(rendered_prompt.encode('utf-8')).hexdigest()
+        return f"{model_name}|{template_id}|{digest}"
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        conn = self.connect()
+        row = conn.execute('SELECT response FROM responses WHERE key = ?', (key,)).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if row is None:
+            return None
+        with conn:
+            conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+        return row[0]
+
+    def put(self, key, model_name, template_id, response):
+        if not self.enabled:
+            return
+        conn = self.connect()
+        with conn:
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete would not fire the size trigger
+            conn.execute(
+                'INSERT INTO responses (key, model, template_id, response, size, last_access) VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET model = excluded.model, template_id = excluded.template_id, '
+                'response = excluded.response, size = excluded.size, last_access = excluded.last_access',
+                (key, model_name, template_id, response, len(response.encode('utf-8')), time.time()),
+            )
+            self.evict(conn)
+
+    def evict(self, conn):
+        row = conn.execute('SELECT total FROM cache_size').fetchone()
+        if row is None:
+            # First write to a new cache, or to one written before the total was kept: summed once
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            conn.execute('INSERT INTO cache_size (id, total) VALUES (0, ?)', (total,))
+        else:
+            total = row[0]
+        if total <= self.max_bytes:
+            return
+        # Drop the least recently used responses until the cache fits again
+        for key, size in conn.execute('SELECT key, size FROM responses ORDER BY last_access').fetchall():
+            conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+        }
+
+
+class TextCache(SQLiteCache):
+    # Parsed documents keyed by the SHA-256 of the file bytes. The raw text is kept next to
+    # the cleaned text so cleaning can change without re-parsing any PDF, and the candidate
+    # URLs (link annotations plus URLs found in the text) let extract_links skip the file too.
+    schema = """
+    CREATE TABLE IF NOT EXISTS documents (
+        digest TEXT PRIMARY KEY,
+        raw_text TEXT NOT NULL,
+        cleaned_text TEXT NOT NULL,
+        links TEXT NOT NULL,
+        page_count INTEGER NOT NULL
+    );
+    """
+
+    def __init__(self, path, enabled=True):
+        super().__init__(path)
+        self.enabled = enabled
+
+    def get(self, digest):
+        if not self.enabled:
+            return None
+        row = self.connect().execute(
+            'SELECT raw_text, cleaned_text, links, page_count FROM documents WHERE digest = ?', (digest,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'raw_text': row[0], 'cleaned_text': row[1], 'links': json.loads(row[2]), 'page_count': row[3]}
+
+    def put(self, digest, document):
+        if not self.enabled:
+            return
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO documents (digest, raw_text, cleaned_text, links, page_count) VALUES (?, ?, ?, ?, ?)',
+                (digest, document['raw_text'], document['cleaned_text'], json.dumps(document['links']), document['page_count']),
+            )
+
+
+def file_digest(file_path, chunk_size=1024 * 1024):
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
@@ -0,0 +1,74 @@
+import os
+import re
+from functools import lru_cache
+
+# Once non-printable characters are gone the only whitespace left is the plain space,
+# so a single regex pass yields the same tokens as str.split()
+TOKEN_PATTERN = re.compile(r'\S+')
+
+
+class NonPrintableTable(dict):
+    # str.translate table dropping non-printable characters. Entries are filled in on first
+    # sight instead of enumerating all of Unicode up front.
+    def __missing__(self, codepoint):
+        value = codepoint if chr(codepoint).isprintable() else None
+        self[codepoint] = value
+        return value
+
+
+NON_PRINTABLE_TABLE = NonPrintableTable()
+
+
+# The merged stopword list is written here the first time it is built, so later processes
+# need neither NLTK's corpus download nor the scikit-learn import
+STOPWORDS_CACHE_PATH = os.environ.get('STOPWORDS_CACHE_PATH', os.path.join('data', 'cache', 'stopwords.txt'))
+
+
+def build_stop_words():
+    # NLTK's English list merged with scikit-learn's; downloads the corpus only if it is missing
+    import nltk
+    from nltk.corpus import stopwords
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+    try:
+        nltk.data.find('corpora/stopwords')
+    except LookupError:
+        nltk.download('stopwords', quiet=True)
+    return frozenset(stopwords.words('english')).union(ENGLISH_STOP_WORDS)
+
+
+@lru_cache(maxsize=None)
+def stop_words():
+    try:
+        with open(STOPWORDS_CACHE_PATH, 'r', encoding='utf-8') as file:
+            return frozenset(file.read().split())
+    except FileNotFoundError:
+        pass
+
+    words = build_stop_words()
+    directory = os.path.dirname(STOPWORDS_CACHE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{STOPWORDS_CACHE_PATH}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        file.write('\n'.join(sorted(words)))
+    os.replace(temp_path, STOPWORDS_CACHE_PATH)
+    return words
+
+
+def remove_non_printable(text):
+    return text if text.isprintable() else text.translate(NON_PRINTABLE_TABLE)
+
+
+def clean_text(text, stop_set=None):
+    if not text:
+        return ""
+    stop_set = stop_words() if stop_set is None else stop_set
+    tokens = TOKEN_PATTERN.findall(remove_non_printable(text))
+    return ' '.join([token for token in tokens if token.lower() not in stop_set])
+
+
+def clean_texts(texts):
+    # Batch variant of clean_text: resolves the stopword set once for the whole list
+    stop_set = stop_words()
+    return [clean_text(text, stop_set) for text in texts]
@@ -0,0 +1,106 @@
+import os
+import re
+
+# Fields found with at least this confidence are taken from the rules and not asked of the LLM
+CONTACT_CONFIDENCE = float(os.environ.get('CONTACT_CONFIDENCE', 0.8))
+# Contact details sit in the resume header; names and unlabelled locations are only looked for here
+HEADER_LINES = 6
+
+EMAIL_PATTERN = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+# Ten to thirteen digits with optional country code, spaces, dots, dashes or brackets in between.
+# Only spaces and tabs, so digits on the next line are never joined into the same number.
+PHONE_PATTERN = re.compile(r'(?<![\w+])\+?\(?\d[\d \t().-]{8,18}\d(?!\w)')
+# Dates and year ranges, e.g. "12-05-2019" or "2016 - 2020", that can look like part of a number
+DATE_PATTERN = re.compile(r'\d{2}[-/]\d{2}[-/]\d{4}|\d{4}\s*-\s*\d{4}')
+PHONE_LABEL_PATTERN = re.compile(r'(?:phone|mobile|mob|tel|cell|contact|ph|p)\s*(?:no\.?|number|#)?\s*[:.-]?\s*$', re.IGNORECASE)
+LABELLED_LOCATION_PATTERN = re.compile(r'^\s*(?:address|location|current location|city)\s*[:\-]\s*(.+?)\s*$', re.IGNORECASE | re.MULTILINE)
+LABELLED_NAME_PATTERN = re.compile(r'^\s*(?:full\s+)?name\s*[:\-]\s*(.+?)\s*$', re.IGNORECASE | re.MULTILINE)
+NAME_PATTERN = re.compile(r"^[A-Za-z][A-Za-z.'-]*(?: [A-Za-z][A-Za-z.'-]*){1,3}$")
+# "City, Region" as one segment of a header line such as "Delhi, IN | P: ... | name@mail.com"
+PLACE_PATTERN = re.compile(r'^[A-Z][A-Za-z .]+,\s*[A-Z][A-Za-z .]+$')
+HEADER_SEPARATORS = re.compile(r'\s*[|•·—–]\s*')
+NOT_A_NAME = {'resume', 'curriculum', 'vitae', 'cv', 'profile', 'summary', 'objective', 'contact', 'experience', 'education'}
+
+
+def field(value=None, confidence=0.0):
+    return {"value": value, "confidence": confidence}
+
+
+def header_lines(text):
+    return [line.strip() for line in text.splitlines() if line.strip()][:HEADER_LINES]
+
+
+def extract_email(text):
+    match = EMAIL_PATTERN.search(text)
+    return field(match.group(0), 0.95) if match else field()
+
+
+def extract_phone(text):
+    best = field()
+    header_end = sum(len(line) + 1 for line in text.splitlines()[:HEADER_LINES * 2])
+    for match in PHONE_PATTERN.finditer(text):
+        number = match.group(0).strip()
+        digits = sum(char.isdigit() for char in number)
+        if not 10 <= digits <= 13 or DATE_PATTERN.search(number):
+            continue
+        if PHONE_LABEL_PATTERN.search(text[max(0, match.start() - 20):match.start()]):
+            confidence = 0.95
+        elif number.startswith('+'):
+            confidence = 0.9
+        elif match.start() < header_end:
+            # Likely, but an unlabelled number could still be an id, so the LLM has the last word
+            confidence = 0.75
+        else:
+            confidence = 0.6
+        if confidence > best["confidence"]:
+            best = field(number, confidence)
+    return best
+
+
+def extract_name(text, email=None):
+    labelled = LABELLED_NAME_PATTERN.search(text)
+    if labelled and NAME_PATTERN.match(labelled.group(1)):
+        return field(labelled.group(1), 0.95)
+
+    email_user = email.split('@')[0].lower() if email else ''
+    for position, line in enumerate(header_lines(text)[:3]):
+        if not NAME_PATTERN.match(line) or NOT_A_NAME.intersection(line.lower().split()):
+            continue
+        confidence = 0.85 if position == 0 else 0.7
+        # Email addresses usually repeat part of the name
+        if email_user and any(len(part) > 2 and part in email_user for part in line.lower().split()):
+            confidence += 0.1
+        return field(line, round(confidence, 2))
+    return field()
+
+
+def extract_location(text):
+    labelled = LABELLED_LOCATION_PATTERN.search(text)
+    if labelled:
+        return field(labelled.group(1).rstrip('.'), 0.9)
+
+    for line in header_lines(text)[1:]:
+        for segment in HEADER_SEPARATORS.split(line):
+            if PLACE_PATTERN.match(segment):
+                return field(segment, 0.75)
+    return field()
+
+
+def extract_contacts(text):
+    # Rule-based contact fields from the raw resume text, each as {"value", "confidence"}
+    if not text:
+        return {"Name": field(), "Email": field(), "Phone": field(), "Location": field()}
+
+    email = extract_email(text)
+    return {
+        "Name": extract_name(text, email["value"]),
+        "Email": email,
+        "Phone": extract_phone(text),
+        "Location": extract_location(text),
+    }
+
+
+def resolved_contacts(contacts, threshold=None):
+    # Field -> value for the fields the rules are confident enough about
+    threshold = CONTACT_CONFIDENCE if threshold is None else threshold
+    return {name: found["value"] for name, found in contacts.items() if found["value"] and found["confidence"] >= threshold}
@@ -0,0 +1,193 @@
+# Long-running ingestion service: watches a resume folder and screens new resumes as they
+# arrive against the job description and skills sheet currently uploaded to the app. Rows
+# go to the same results store the app reads, so they show up on the results page as they
+# are screened.
+#
+#   python ingest.py [--folder data/resumes] [--interval 2] [--debounce 5] [--queue-size 50] [--batch-size 5]
+#
+# Run it from the App5 directory, next to app.py. Screening settings (PARSE_WORKERS,
+# LLM_WORKERS, ASYNC_LLM, SINGLE_PASS, ...) are read from the same environment variables.
+import os
+import time
+import queue
+import argparse
+import threading
+from utils import pdfs_to_cleaned_and_extracted_excel, find_job_files, RESUME_EXTENSIONS
+from jobs import ScreeningLock
+
+# Seconds between two scans of the folder
+INGEST_INTERVAL = float(os.environ.get('INGEST_INTERVAL', 2))
+# Seconds a file's size and mtime must stay unchanged before it is queued, so files that are
+# still being copied into the folder are not picked up half-written
+INGEST_DEBOUNCE = float(os.environ.get('INGEST_DEBOUNCE', 5))
+# Files waiting to be screened; the watcher pauses while the queue is full
+INGEST_QUEUE_SIZE = int(os.environ.get('INGEST_QUEUE_SIZE', 50))
+# Files screened per pipeline run
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 5))
+
+
+class FolderWatcher:
+    # Polls a folder and reports each new or changed file once, after it has stopped changing
+    # for the debounce period. Polling needs no extra dependency and also works on network
+    # shares, where inotify events are not delivered.
+
+    def __init__(self, folder, debounce=INGEST_DEBOUNCE, extensions=RESUME_EXTENSIONS):
+        self.folder = folder
+        self.debounce = debounce
+        self.extensions = extensions
+        self.lock = threading.Lock()
+        # filename -> ((size, mtime), first seen with that signature)
+        self.settling = {}
+        # filename -> (size, mtime) it was last reported with
+        self.reported = {}
+
+    def scan(self):
+        # Files that became ready since the last scan, in folder order
+        now = time.monotonic()
+        ready, present = [], set()
+        entries = os.scandir(self.folder) if os.path.isdir(self.folder) else []
+        with self.lock:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith(self.extensions):
+                    continue
+                stat = entry.stat()
+                signature = (stat.st_size, stat.st_mtime)
+                present.add(entry.name)
+                if self.reported.get(entry.name) == signature:
+                    continue
+                settling = self.settling.get(entry.name)
+                if settling is None or settling[0] != signature:
+                    self.settling[entry.name] = (signature, now)
+                elif now - settling[1] >= self.debounce:
+                    del self.settling[entry.name]
+                    self.reported[entry.name] = signature
+                    ready.append(entry.name)
+
+            # A file that is removed and added again is reported again
+            for filename in (self.settling.keys() | self.reported.keys()) - present:
+                self.settling.pop(filename, None)
+                self.reported.pop(filename, None)
+        return ready
+
+    def forget(self, filenames):
+        # Reports the files again on a later scan, e.g. after their screening failed
+        with self.lock:
+            for filename in filenames:
+                self.reported.pop(filename, None)
+
+
+class IngestService:
+    # A watcher thread feeds a bounded queue and a screening thread drains it in small batches.
+    # When screening falls behind, the queue fills up and the watcher waits, so a large drop of
+    # files is taken in at the pace the LLM can screen it instead of in one burst.
+
+    def __init__(self, resume_folder, upload_folder, final_excel_path, interval=INGEST_INTERVAL, debounce=INGEST_DEBOUNCE,
+                 queue_size=INGEST_QUEUE_SIZE, batch_size=INGEST_BATCH_SIZE, **screening_options):
+        self.resume_folder = resume_folder
+        self.upload_folder = upload_folder
+        self.final_excel_path = final_excel_path
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self.screening_options = screening_options
+        # Shared with the app's screening jobs, so a batch never runs next to a Process run
+        self.screening_lock = ScreeningLock()
+        self.watcher = FolderWatcher(resume_folder, debounce)
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def start(self):
+        self.threads = [
+            threading.Thread(target=self.watch, name='ingest-watch', daemon=True),
+            threading.Thread(target=self.screen, name='ingest-screen', daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self, timeout=None):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def watch(self):
+        while not self.stop_event.is_set():
+            for filename in self.watcher.scan():
+                # Blocks while the queue is full; that is the backpressure on the watcher
+                while not self.stop_event.is_set():
+                    try:
+                        self.queue.put(filename, timeout=self.interval)
+                        break
+                    except queue.Full:
+                        continue
+            self.stop_event.wait(self.interval)
+
+    def next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=self.interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def screen(self):
+        while not self.stop_event.is_set():
+            batch = self.next_batch()
+            if not batch:
+                continue
+
+            # The active job description is whatever is uploaded when the batch starts
+            job_description_path, eval_template_path = find_job_files(self.upload_folder)
+            while (not job_description_path or not eval_template_path) and not self.stop_event.is_set():
+                print("Ingest: waiting for a job description and skills sheet to be uploaded")
+                self.stop_event.wait(max(self.interval, 10))
+                job_description_path, eval_template_path = find_job_files(self.upload_folder)
+            if self.stop_event.is_set():
+                return
+
+            print(f"Ingest: screening {len(batch)} resumes, {self.queue.qsize()} waiting")
+            try:
+                # Already screened content is skipped or copied by the pipeline; the workbook is
+                # written when it is downloaded rather than after every batch
+                with self.screening_lock:
+                    pdfs_to_cleaned_and_extracted_excel(self.resume_folder, job_description_path, eval_template_path,
+                                                        self.final_excel_path, filenames=batch, materialize=False,
+                                                        **self.screening_options)
+            except Exception as e:
+                print(f"Ingest: screening {batch} failed: {e}")
+                self.watcher.forget(batch)
+                self.stop_event.wait(self.interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen resumes as they are added to a folder.")
+    parser.add_argument('--folder', default=os.path.join('data', 'resumes'), help="folder to watch")
+    parser.add_argument('--uploads', default=os.path.join('data', 'uploads'), help="folder holding the job description and skills sheet")
+    parser.add_argument('--output', default=os.path.join('data', 'processed', 'processed_profiles.xlsx'), help="results workbook")
+    parser.add_argument('--interval', type=float, default=INGEST_INTERVAL)
+    parser.add_argument('--debounce', type=float, default=INGEST_DEBOUNCE)
+    parser.add_argument('--queue-size', type=int, default=INGEST_QUEUE_SIZE)
+    parser.add_argument('--batch-size', type=int, default=INGEST_BATCH_SIZE)
+    args = parser.parse_args()
+
+    service = IngestService(
+        args.folder, args.uploads, args.output, interval=args.interval, debounce=args.debounce,
+        queue_size=args.queue_size, batch_size=args.batch_size,
+        parse_workers=int(os.environ.get('PARSE_WORKERS', 1)), llm_workers=int(os.environ.get('LLM_WORKERS', 1)),
+        use_async=os.environ.get('ASYNC_LLM', '0') == '1', single_pass=os.environ.get('SINGLE_PASS', '0') == '1',
+    )
+    print(f"Ingest: watching {args.folder}")
+    service.start()
+    try:
+        while not service.stop_event.is_set():
+            service.stop_event.wait(1)
+    except KeyboardInterrupt:
+        print("Ingest: stopping")
+        service.stop(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import uuid
+import threading
+
+# Lock file shared by every process that screens into the same data folder (the app and ingest.py)
+SCREENING_LOCK_PATH = os.environ.get('SCREENING_LOCK_PATH', os.path.join('data', 'cache', 'screening.lock'))
+
+
+class ScreeningLock:
+    # Lets one screening run at a time use the results store, registry and resume folder, across
+    # processes. It is an OS file lock, so it is released when the holder exits, even on a crash.
+
+    def __init__(self, path=SCREENING_LOCK_PATH):
+        self.path = path
+        self.thread_lock = threading.Lock()
+        self.file = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(self.path, 'a+')
+            if os.name == 'nt':
+                import msvcrt
+                self.file.seek(0)
+                while True:
+                    # LK_LOCK gives up after about 10 seconds; keep waiting
+                    try:
+                        msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+            else:
+                import fcntl
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            self.thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self.file.close()
+            self.file = None
+            self.thread_lock.release()
+
+
+class Job:
+    # One screening run executed on a worker thread. Progress updates wake up any
+    # Server-Sent Events stream waiting on the job's condition.
+
+    def __init__(self, job_id):
+        self.id = job_id
+        self.status = 'queued'
+        self.total = 0
+        self.processed = 0
+        self.current_file = None
+        self.completed_files = []
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.version = 0
+        self.condition = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ('completed', 'failed')
+
+    def update(self, **fields):
+        with self.condition:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+            self.condition.notify_all()
+
+    def progress(self, processed, total, filename=None):
+        # Passed to the pipeline as its progress_callback
+        with self.condition:
+            self.processed = processed
+            self.total = total
+            if filename:
+                self.completed_files.append(filename)
+            self.version += 1
+            self.condition.notify_all()
+
+    def eta_seconds(self):
+        if not self.started_at or not self.processed or self.done:
+            return None
+        elapsed = time.time() - self.started_at
+        return elapsed / self.processed * (self.total - self.processed)
+
+    def to_dict(self, files_offset=None, files_limit=None):
+        # Progress events carry only the count and the latest file, so each one stays the same
+        # size however long the run; completed_files is listed, a page at a time, only when
+        # files_offset is given
+        with self.condition:
+            eta = self.eta_seconds()
+            job = {
+                'job_id': self.id,
+                'status': self.status,
+                'total': self.total,
+                'processed': self.processed,
+                'completed_count': len(self.completed_files),
+                'last_file': self.completed_files[-1] if self.completed_files else None,
+                'eta_seconds': round(eta, 1) if eta is not None else None,
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+            }
+            if files_offset is not None:
+                end = None if files_limit is None else files_offset + files_limit
+                job['completed_files'] = self.completed_files[files_offset:end]
+            return job
+
+    def events(self, heartbeat=15):
+        # Yields SSE messages for every change until the job finishes; comments keep proxies from timing out
+        seen = -1
+        while True:
+            with self.condition:
+                if self.version == seen:
+                    self.condition.wait(timeout=heartbeat)
+                changed = self.version != seen
+                seen = self.version
+            if changed:
+                event = 'done' if self.done else 'progress'
+                yield f"event: {event}\ndata: {json.dumps(self.to_dict())}\n\n"
+                if self.done:
+                    return
+            else:
+                yield ": keep-alive\n\n"
+
+
+class JobManager:
+    # Runs screening jobs in the background. Jobs share the results store, so only one
+    # runs at a time; submitting while one is active returns the active job. A job also waits
+    # for screening_lock, which ingest.py takes for each of its batches.
+
+    def __init__(self, screening_lock=None):
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.active_job = None
+        self.screening_lock = screening_lock or ScreeningLock()
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def submit(self, target, *args, **kwargs):
+        with self.lock:
+            if self.active_job is not None and not self.active_job.done:
+                return self.active_job
+            job = Job(uuid.uuid4().hex)
+            self.jobs[job.id] = job
+            self.active_job = job
+
+        worker = threading.Thread(target=self.run, args=(job, target, args, kwargs), daemon=True)
+        worker.start()
+        return job
+
+    def run(self, job, target, args, kwargs):
+        # Stays queued while another process screens into the same data folder
+        with self.screening_lock:
+            job.update(status='running', started_at=time.time())
+            try:
+                target(*args, progress_callback=job.progress, **kwargs)
+            except Exception as e:
+                job.update(status='failed', error=str(e), finished_at=time.time())
+                raise
+            job.update(status='completed', finished_at=time.time())
@@ -0,0 +1,64 @@
+import os
+import threading
+
+# Connection settings for the Ollama server
+LLM_MODEL = os.environ.get('LLM_MODEL', 'phi3')
+OLLAMA_HOST = os.environ.get('OLLAMA_HOST', 'http://localhost:11434')
+# Maximum pooled HTTP connections per client (keep it >= LLM_WORKERS)
+LLM_POOL_SIZE = int(os.environ.get('LLM_POOL_SIZE', 8))
+# Seconds to wait for a generation before giving up
+LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 600))
+# How long Ollama keeps the model loaded after the last request, so it is not unloaded between resumes
+LLM_KEEP_ALIVE = os.environ.get('LLM_KEEP_ALIVE', '30m')
+
+clients = {}
+clients_lock = threading.Lock()
+# Replaces the Ollama clients everywhere when set, e.g. with a fake model in tests
+llm_override = None
+
+
+def create_llm(json_mode=False):
+    import httpx
+    from langchain_ollama import OllamaLLM
+
+    # The model is stateless between calls, so one client with keep-alive connections serves
+    # every resume. JSON mode constrains Ollama's sampler to emit a single valid JSON object.
+    return OllamaLLM(
+        model=LLM_MODEL,
+        base_url=OLLAMA_HOST,
+        format="json" if json_mode else "",
+        keep_alive=LLM_KEEP_ALIVE,
+        client_kwargs={
+            'timeout': httpx.Timeout(LLM_TIMEOUT, connect=10.0),
+            'limits': httpx.Limits(max_connections=LLM_POOL_SIZE, max_keepalive_connections=LLM_POOL_SIZE),
+        },
+    )
+
+
+def get_llm(json_mode=False):
+    # Shared client for synchronous calls; httpx.Client is safe to use from several threads
+    if llm_override is not None:
+        return llm_override
+    with clients_lock:
+        if json_mode not in clients:
+            clients[json_mode] = create_llm(json_mode)
+        return clients[json_mode]
+
+
+def get_async_llm(json_mode=False):
+    # httpx.AsyncClient connections belong to the event loop that opened them, so each
+    # asyncio.run() batch gets its own client and reuses it for all of its requests
+    if llm_override is not None:
+        return llm_override
+    return create_llm(json_mode)
+
+
+def set_llm(llm):
+    # Swap in any LangChain LLM (e.g. FakeListLLM) for every caller; set_llm(None) restores Ollama
+    global llm_override
+    llm_override = llm
+
+
+def use_fake_llm(responses):
+    from langchain_core.language_models.fake import FakeListLLM
+    set_llm(FakeListLLM(responses=responses))
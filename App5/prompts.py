@@ -0,0 +1,200 @@
+import string
+import threading
+from functools import lru_cache
+
+# Every variable a prompt may use, in the order it must appear. Ollama keeps the KV cache of the
+# previous request and only evaluates the part of a new prompt after the longest common prefix,
+# so the instructions and the per-job inputs (job description, skills) come first and the
+# per-resume inputs last. Everything before the first per-resume variable is then prefilled
+# once per job instead of once per resume.
+JOB_VARIABLES = ('job_description', 'skills_prompt', 'skills_list')
+RESUME_VARIABLES = ('field_instructions', 'field_outputs', 'resume_text')
+VARIABLE_ORDER = JOB_VARIABLES + RESUME_VARIABLES
+
+
+def template_variables(template):
+    return [name for _, name, _, _ in string.Formatter().parse(template) if name]
+
+
+class Prompt:
+    # A registered prompt template. The layout is checked once at registration: known variables
+    # only, each used once, in VARIABLE_ORDER, with the resume text as the last variable.
+
+    def __init__(self, template_id, template, version=1):
+        self.template_id = template_id
+        self.template = template
+        self.version = version
+        self.variables = template_variables(template)
+
+        unknown = [name for name in self.variables if name not in VARIABLE_ORDER]
+        if unknown:
+            raise ValueError(f"Prompt {template_id} uses unknown variables {unknown}")
+        if len(set(self.variables)) != len(self.variables):
+            raise ValueError(f"Prompt {template_id} uses a variable more than once")
+        if self.variables != sorted(self.variables, key=VARIABLE_ORDER.index):
+            raise ValueError(f"Prompt {template_id} must order its variables as {VARIABLE_ORDER}, not {self.variables}")
+
+    @property
+    def cache_id(self):
+        # Bumping the version keeps responses to an older wording out of the LLM cache
+        return f"{self.template_id}@{self.version}"
+
+    def render(self, inputs):
+        return self.template.format(**inputs)
+
+
+PROMPTS = {}
+
+
+def register_prompt(template_id, template, version=1):
+    PROMPTS[template_id] = Prompt(template_id, template, version)
+    return PROMPTS[template_id]
+
+
+def get_prompt(template_id):
+    return PROMPTS[template_id]
+
+
+def prompt_versions(template_ids):
+    # Versions of a set of prompts as one string, e.g. "job_role@1,single_pass@1"
+    return ','.join(get_prompt(template_id).cache_id for template_id in template_ids)
+
+
+register_prompt('job_role', """
+Based on the job description below, identify which role this job description is targeted to. Use only one word or phrase for the role.
+
+Return the result in this exact format with nothing else:
+
+Role: [SINGLE ROLE, in 2 words]
+
+Job Description: {job_description}
+""")
+
+# The role is inferred once per job description (job_role), so per resume only the score is asked for
+register_prompt('score', """
+You are tasked with evaluating a candidate based on the provided job description and resume. Your task is to produce exactly one output:
+
+**Score**: A numerical score (0-100) that represents how well the resume aligns with the job description.
+
+### Important Instructions:
+- ONLY use the resume to determine how well the candidate fits the job description.
+- The **Score** must be a NUMBER between 0 and 100 based on the alignment between the resume and job description.
+- Return the result in this exact format with nothing else:
+
+Score: [NUMBER]
+
+### Job Description:
+{job_description}
+
+### Resume Text:
+{resume_text}
+""")
+
+# Label, instruction and output placeholder of each field the bulk-info prompt can ask for
+BULK_INFO_FIELDS = {
+    "Name": ("Name", "(The exact name as written in the resume).", "[Extracted Full Name]"),
+    "Location": ("Location", "(The full address or location as mentioned in the resume).", "[Extracted Full Location]"),
+    "Phone": ("Phone Number", "(The phone number as written in the resume).", "[Extracted Phone Number]"),
+    "Experience": ("Total Experience in Years", "(Extract the number of years of experience mentioned in the resume. If it's not directly specified, compute it and provide reasoning for the computed experience).", "[Extracted Experience in Years]"),
+    "Fitment Summary": ("Fitment Summary", "(Summarize the relevant skills and experience found in the resume, but do not infer or add any extra details).", "[Extracted Fitment Summary]"),
+}
+
+# The requested fields depend on what the contact rules already found, so they follow the
+# constant instructions instead of opening the prompt
+register_prompt('bulk_info', """
+You are given a resume. Your task is to strictly retrieve information from the resume text provided and not infer or generate any additional content. If the required information is not present in the resume, return "Not mentioned" without making any assumptions.
+
+Important:
+- Only retrieve information directly from the resume text.
+- If any required information is missing, mention "Not mentioned."
+- Do NOT infer or generate details.
+- Location and name might be grouped together, if grouped seperate them.
+- If total experience is not specified, try to compute it based on the resume.
+
+Please extract and return the following information from the resume text:
+{field_instructions}
+
+Provide the output in the following format:
+
+Output:
+{field_outputs}
+
+Here is the resume text:
+{resume_text}
+""")
+
+
+@lru_cache(maxsize=None)
+def bulk_info_inputs(fields):
+    # Prompt variables asking for the given fields (keys of BULK_INFO_FIELDS)
+    return {
+        'field_instructions': "\n".join(f"{number}. {BULK_INFO_FIELDS[name][0]}: {BULK_INFO_FIELDS[name][1]}" for number, name in enumerate(fields, 1)),
+        'field_outputs': "\n".join(f"- {BULK_INFO_FIELDS[name][0]}: {BULK_INFO_FIELDS[name][2]}" for name in fields),
+    }
+
+
+register_prompt('skills', """
+    {skills_prompt}
+
+    For each skill, provide a brief evaluation in 50-100 words or say 'Not mentioned' if the skill is not mentioned in the resume.
+
+    Candidate Resume:
+    {resume_text}
+    """)
+
+register_prompt('single_pass', """
+You are evaluating a candidate for a job. Read the job description, the list of skills and the resume, then return ONE JSON object and nothing else.
+
+Rules:
+- Name, Location, Phone and Experience must be retrieved from the resume only. Use "Not mentioned" when they are missing, do NOT infer them.
+- Location and name might be grouped together, if grouped seperate them.
+- Experience is the total experience in years. If it is not specified, compute it from the resume.
+- Fitment Summary summarizes the relevant skills and experience found in the resume without adding extra details.
+- Score is a NUMBER between 0 and 100 for how well the resume aligns with the job description.
+- Skills has one entry per listed skill with a brief evaluation in 50-100 words, or "Not mentioned" if the skill is not in the resume.
+
+Return the JSON object in exactly this shape:
+{{"Name": "...", "Location": "...", "Phone": "...", "Experience": "...", "Fitment Summary": "...", "Score": 0, "Skills": {{"<skill>": "..."}}}}
+
+Job Description:
+{job_description}
+
+Skills to evaluate:
+{skills_list}
+
+Resume Text:
+{resume_text}
+""")
+
+
+class PrefillStats:
+    # Ollama's prompt evaluation (prefill) counters per prompt. A reused prefix shows up as
+    # fewer evaluated prompt tokens and a shorter prompt_eval_duration on later calls.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.prompts = {}
+
+    def record(self, template_id, generation_info):
+        # generation_info is the final chunk of an Ollama response; fake models report none
+        if not generation_info or 'prompt_eval_duration' not in generation_info:
+            return
+        with self.lock:
+            entry = self.prompts.setdefault(template_id, {'calls': 0, 'prompt_tokens': 0, 'prefill_ns': 0})
+            entry['calls'] += 1
+            entry['prompt_tokens'] += generation_info.get('prompt_eval_count') or 0
+            entry['prefill_ns'] += generation_info.get('prompt_eval_duration') or 0
+
+    def summary(self):
+        with self.lock:
+            return {
+                template_id: {
+                    'calls': entry['calls'],
+                    'avg_prompt_tokens': round(entry['prompt_tokens'] / entry['calls'], 1),
+                    'avg_prefill_ms': round(entry['prefill_ns'] / entry['calls'] / 1e6, 1),
+                }
+                for template_id, entry in self.prompts.items()
+            }
+
+
+prefill_stats = PrefillStats()
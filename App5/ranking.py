@@ -0,0 +1,95 @@
+import os
+from functools import lru_cache
+
+# Sentence-embedding model for the pre-filter. Used when sentence-transformers is installed and
+# the model is available locally; otherwise (or with EMBEDDING_MODEL=tfidf) TF-IDF is used.
+EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+# Width of the hashed term vectors used by embed_texts without an embedding model. Unlike TF-IDF
+# they need no fitted vocabulary, so vectors stored in the resume index stay comparable over time.
+HASHING_FEATURES = int(os.environ.get('HASHING_FEATURES', 2048))
+
+
+@lru_cache(maxsize=None)
+def load_embedding_model(model_name):
+    # Returns None when the model cannot be loaded, so callers fall back to TF-IDF
+    if not model_name or model_name == 'tfidf':
+        return None
+    try:
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    except Exception as e:
+        print(f"Embedding model {model_name} unavailable ({e}); using term-frequency vectors")
+        return None
+
+
+def embedding_backend(model_name=None):
+    return 'embeddings' if load_embedding_model(model_name or EMBEDDING_MODEL) is not None else 'tfidf'
+
+
+def embedder_name(model_name=None):
+    # Identifies the vector space embed_texts produces; vectors from different spaces must not be mixed
+    model_name = model_name or EMBEDDING_MODEL
+    return model_name if load_embedding_model(model_name) is not None else f'hashing-{HASHING_FEATURES}'
+
+
+def embed_texts(texts, model_name=None):
+    # Unit-length float32 vectors, one row per text, that do not depend on the other texts
+    import numpy as np
+
+    model = load_embedding_model(model_name or EMBEDDING_MODEL)
+    if model is not None:
+        return model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.preprocessing import normalize
+
+    matrix = HashingVectorizer(n_features=HASHING_FEATURES, alternate_sign=False, norm=None).transform(texts)
+    matrix.data = np.log1p(matrix.data)
+    return normalize(matrix).toarray().astype(np.float32)
+
+
+def tfidf_similarities(query, documents):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    # Rows are L2-normalised, so one sparse matrix-vector product gives every cosine at once
+    matrix = TfidfVectorizer(sublinear_tf=True).fit_transform([query] + documents)
+    return (matrix[1:] @ matrix[0].T).toarray().ravel()
+
+
+def embedding_similarities(model, query, documents):
+    vectors = model.encode([query] + documents, normalize_embeddings=True, convert_to_numpy=True)
+    return vectors[1:] @ vectors[0]
+
+
+def similarity_scores(query, documents, model_name=None):
+    # Cosine similarity of each document to the query, as a NumPy array in document order
+    import numpy as np
+
+    if not documents:
+        return np.zeros(0)
+    if not query.strip():
+        return np.zeros(len(documents))
+
+    model = load_embedding_model(model_name or EMBEDDING_MODEL)
+    if model is not None:
+        return embedding_similarities(model, query, documents)
+    try:
+        return tfidf_similarities(query, documents)
+    except ValueError:
+        # Every text was empty or stopwords only
+        return np.zeros(len(documents))
+
+
+def select_candidates(scores, top_k=None, threshold=None):
+    # Boolean mask of the documents to keep: the top_k best scores and/or those at or above
+    # threshold. Both limits apply when both are given; neither keeps everything.
+    import numpy as np
+
+    keep = np.ones(len(scores), dtype=bool)
+    if threshold is not None:
+        keep &= scores >= threshold
+    if top_k and top_k < len(scores):
+        top = np.zeros(len(scores), dtype=bool)
+        top[np.argpartition(-scores, top_k - 1)[:top_k]] = True
+        keep &= top
+    return keep
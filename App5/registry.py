@@ -0,0 +1,84 @@
+import os
+import json
+import time
+from collections import namedtuple
+from cache import SQLiteCache, file_digest
+
+# Everything besides the resume that decides its screening result. Prompt versions are the
+# cache ids of the prompts used, e.g. "job_role@1,single_pass@1".
+ScreeningContext = namedtuple('ScreeningContext', ('jd_digest', 'skills_digest', 'model', 'prompt_version'))
+
+
+def context_key(context):
+    return '|'.join(context)
+
+
+class ResumeRegistry(SQLiteCache):
+    # Resumes known by content. files maps each resume path to the SHA-256 of its content,
+    # hashed again only when the file's size or mtime change. screenings keeps the row each
+    # digest was screened into under every context, so the same CV under another name is not
+    # screened again, while a different CV under an old name is.
+    schema = """
+    CREATE TABLE IF NOT EXISTS files (
+        path TEXT PRIMARY KEY,
+        digest TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        mtime REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS files_digest ON files (digest);
+    CREATE TABLE IF NOT EXISTS screenings (
+        digest TEXT NOT NULL,
+        jd_digest TEXT NOT NULL,
+        skills_digest TEXT NOT NULL,
+        model TEXT NOT NULL,
+        prompt_version TEXT NOT NULL,
+        data TEXT NOT NULL,
+        screened_at REAL NOT NULL,
+        PRIMARY KEY (digest, jd_digest, skills_digest, model, prompt_version)
+    );
+    """
+
+    def __init__(self, path, enabled=True):
+        super().__init__(path)
+        self.enabled = enabled
+
+    def digests(self, folder, filenames):
+        # {filename: digest} for files of one folder
+        conn = self.connect()
+        known = {path: (digest, size, mtime) for path, digest, size, mtime in conn.execute('SELECT path, digest, size, mtime FROM files')}
+        digests, changed = {}, []
+        for filename in filenames:
+            path = os.path.abspath(os.path.join(folder, filename))
+            stat = os.stat(path)
+            entry = known.get(path)
+            if entry is not None and entry[1:] == (stat.st_size, stat.st_mtime):
+                digests[filename] = entry[0]
+            else:
+                digests[filename] = file_digest(path)
+                changed.append((path, digests[filename], stat.st_size, stat.st_mtime))
+        if changed:
+            with conn:
+                conn.executemany('INSERT OR REPLACE INTO files (path, digest, size, mtime) VALUES (?, ?, ?, ?)', changed)
+        return digests
+
+    def screened(self, digest, context):
+        # The row this content was screened into under the context, or None
+        if not self.enabled:
+            return None
+        row = self.connect().execute(
+            'SELECT data FROM screenings WHERE digest = ? AND jd_digest = ? AND skills_digest = ? AND model = ? AND prompt_version = ?',
+            (digest, *context),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record(self, digest, context, row):
+        if not self.enabled:
+            return
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO screenings (digest, jd_digest, skills_digest, model, prompt_version, data, screened_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (digest, *context, json.dumps(row, default=str), time.time()),
+            )
+
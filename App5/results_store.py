@@ -0,0 +1,178 @@
+import os
+import json
+import sqlite3
+from contextlib import closing
+
+# Columns /api/profiles can sort by, mapped to their indexed store columns
+SORT_COLUMNS = {"Score": "score", "Role": "role"}
+
+
+def results_store_path(final_excel_path):
+    # The store lives next to the workbook, so clearing the processed folder clears both
+    return os.path.splitext(final_excel_path)[0] + '.sqlite'
+
+
+def row_score(row):
+    # Numeric score of a result row, or None for "Not generated", "Filtered out" and the like
+    score = row.get('Score')
+    if isinstance(score, bool):
+        return None
+    try:
+        return float(score)
+    except (TypeError, ValueError):
+        return None
+
+
+class ResultsStore:
+    # Table of screening results, one row per resume. Writing a row is O(1); the
+    # .xlsx is only materialized at the end of a run or when someone asks for it. Role and
+    # score are kept in indexed columns next to the JSON row so pages of results can be
+    # filtered and sorted without reading the whole table.
+    schema = """
+    CREATE TABLE IF NOT EXISTS results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        filename TEXT NOT NULL,
+        data TEXT NOT NULL,
+        role TEXT,
+        score REAL,
+        digest TEXT,
+        context TEXT
+    );
+    CREATE INDEX IF NOT EXISTS results_filename ON results (filename);
+    """
+    # Columns added after the first release, in order
+    added_columns = {'role': 'TEXT', 'score': 'REAL', 'digest': 'TEXT', 'context': 'TEXT'}
+    indexes = """
+    CREATE INDEX IF NOT EXISTS results_score ON results (score);
+    CREATE INDEX IF NOT EXISTS results_role_score ON results (role, score);
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        # Short-lived connections: the processed folder can be wiped between requests
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.executescript(self.schema)
+        self.migrate(conn)
+        conn.executescript(self.indexes)
+        return conn
+
+    def migrate(self, conn):
+        # Stores written before role and score had their own columns get them filled from the JSON
+        # rows. Older rows have no digest or context; they are matched by file name only.
+        columns = {name for _, name, *_ in conn.execute('PRAGMA table_info(results)')}
+        missing = [name for name in self.added_columns if name not in columns]
+        if not missing:
+            return
+        with conn:
+            for name in missing:
+                conn.execute(f'ALTER TABLE results ADD COLUMN {name} {self.added_columns[name]}')
+            if 'role' not in missing:
+                return
+            rows = [(row_id, json.loads(data)) for row_id, data in conn.execute('SELECT id, data FROM results')]
+            conn.executemany('UPDATE results SET role = ?, score = ? WHERE id = ?',
+                             [(row.get('Role'), row_score(row), row_id) for row_id, row in rows])
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def record(self, row, digest=None, context=None):
+        return row['Filename'], json.dumps(row, default=str), row.get('Role'), row_score(row), digest, context
+
+    def replace(self, row, digest=None, context=None):
+        # Appends the row in place of any earlier row for the same file name, e.g. after the file's
+        # content or the job description changed
+        with closing(self.connect()) as conn, conn:
+            conn.execute('DELETE FROM results WHERE filename = ?', (row['Filename'],))
+            conn.execute('INSERT INTO results (filename, data, role, score, digest, context) VALUES (?, ?, ?, ?, ?, ?)',
+                         self.record(row, digest, context))
+
+    def extend(self, rows):
+        with closing(self.connect()) as conn, conn:
+            conn.executemany('INSERT INTO results (filename, data, role, score, digest, context) VALUES (?, ?, ?, ?, ?, ?)',
+                             [self.record(row) for row in rows])
+
+    def entries(self):
+        # {filename: (digest, context)} of the stored rows; both are None for rows written before they were recorded
+        if not self.exists():
+            return {}
+        with closing(self.connect()) as conn:
+            return {filename: (digest, context) for filename, digest, context in
+                    conn.execute('SELECT filename, digest, context FROM results ORDER BY id')}
+
+    def rows(self):
+        if not self.exists():
+            return []
+        with closing(self.connect()) as conn:
+            return [json.loads(data) for (data,) in conn.execute('SELECT data FROM results ORDER BY id')]
+
+    def count(self):
+        if not self.exists():
+            return 0
+        with closing(self.connect()) as conn:
+            return conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def roles(self):
+        if not self.exists():
+            return []
+        with closing(self.connect()) as conn:
+            return [role for (role,) in conn.execute('SELECT DISTINCT role FROM results WHERE role IS NOT NULL ORDER BY role')]
+
+    def query(self, offset=0, limit=50, sort=None, descending=True, role=None, min_score=None, max_score=None, columns=None):
+        # One page of rows as (total matching rows, rows). Rows without a numeric score sort
+        # below every score and are left out by a score range. columns keeps only those fields.
+        if not self.exists():
+            return 0, []
+
+        conditions, params = [], []
+        if role:
+            conditions.append('role = ?')
+            params.append(role)
+        if min_score is not None:
+            conditions.append('score >= ?')
+            params.append(min_score)
+        if max_score is not None:
+            conditions.append('score <= ?')
+            params.append(max_score)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        direction = 'DESC' if descending else 'ASC'
+        order = f"{SORT_COLUMNS[sort]} {direction}, id {direction}" if sort else 'id'
+
+        with closing(self.connect()) as conn:
+            total = conn.execute(f'SELECT COUNT(*) FROM results {where}', params).fetchone()[0]
+            page = conn.execute(f'SELECT data FROM results {where} ORDER BY {order} LIMIT ? OFFSET ?',
+                                params + [limit, offset]).fetchall()
+
+        rows = [json.loads(data) for (data,) in page]
+        if columns:
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+        return total, rows
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame(self.rows())
+
+    def import_excel(self, excel_path):
+        # Seeds the store from a workbook written before the store existed
+        import pandas as pd
+        df = pd.read_excel(excel_path)
+        self.extend(df.where(df.notna(), None).to_dict('records'))
+
+    def export_excel(self, excel_path):
+        # Written to a temporary file first so readers never see a half-written workbook
+        temp_path = excel_path + '.tmp.xlsx'
+        self.to_dataframe().to_excel(temp_path, index=False)
+        os.replace(temp_path, excel_path)
+
+    def materialize(self, excel_path):
+        # Rewrites the workbook only when the store has changed since it was last exported
+        if not self.count():
+            return os.path.exists(excel_path)
+        if not os.path.exists(excel_path) or os.path.getmtime(excel_path) < os.path.getmtime(self.path):
+            self.export_excel(excel_path)
+        return True
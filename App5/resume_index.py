@@ -0,0 +1,272 @@
+import os
+import threading
+from cache import SQLiteCache, file_digest
+
+# Resumes are embedded in overlapping windows of words; a resume scores as its best chunk
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 50
+# Deleted chunks are only flagged; the vector file is rewritten once this share of it is dead
+COMPACT_RATIO = 0.25
+
+
+def chunk_text(text, size=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    words = text.split()
+    step = size - overlap
+    return [' '.join(words[start:start + size]) for start in range(0, max(len(words) - overlap, 1), step)] if words else []
+
+
+class ResumeIndex(SQLiteCache):
+    # Persistent vector index of every resume in the resume folder. Chunk vectors live in a
+    # float32 file read through numpy.memmap; SQLite maps vector rows to resume digests and
+    # filenames. Adding appends rows, deleting flags them, and compaction rewrites the vector
+    # file under a new generation so concurrent readers keep a consistent view.
+    schema = """
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS files (
+        filename TEXT PRIMARY KEY,
+        digest TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        mtime REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS files_digest ON files (digest);
+    CREATE TABLE IF NOT EXISTS chunks (
+        row INTEGER PRIMARY KEY,
+        digest TEXT NOT NULL,
+        deleted INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS chunks_digest ON chunks (digest);
+    """
+
+    def __init__(self, directory):
+        super().__init__(os.path.join(directory, 'index.sqlite'))
+        self.directory = directory
+        self.lock = threading.RLock()
+        # Serialises syncs. A sync takes self.lock only per file, so searches are answered from
+        # the current index while a bulk upload is still being indexed.
+        self.sync_lock = threading.Lock()
+        # In-memory view of the index, reloaded whenever its version changes
+        self.loaded_version = None
+        self.vectors = None
+        self.doc_codes = None
+        self.doc_digests = None
+        self.live = None
+
+    # -- metadata ---------------------------------------------------------------------------
+
+    def set_meta(self, conn, **values):
+        conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                         [(key, str(value)) for key, value in values.items()])
+
+    def state(self):
+        # (vector space, dimension, rows in use, file generation, version)
+        conn = self.connect()
+        meta = dict(conn.execute('SELECT key, value FROM meta'))
+        return (meta.get('embedder'), int(meta.get('dim', 0)), int(meta.get('rows', 0)),
+                int(meta.get('generation', 0)), int(meta.get('version', 0)))
+
+    def vectors_path(self, generation):
+        return os.path.join(self.directory, f'vectors-{generation}.f32')
+
+    def open_vectors(self, generation, dim, rows):
+        # Read-only view of the first rows of a vector file; pages are loaded on demand
+        import numpy as np
+
+        path = self.vectors_path(generation)
+        if not rows or not os.path.exists(path):
+            return np.zeros((0, dim), dtype=np.float32)
+        capacity = os.path.getsize(path) // (dim * 4)
+        return np.memmap(path, dtype=np.float32, mode='r', shape=(capacity, dim))[:rows]
+
+    def reset(self, embedder, dim):
+        # Drops everything, e.g. when the embedding model changes and old vectors no longer compare
+        conn = self.connect()
+        _, _, _, generation, version = self.state()
+        with conn:
+            conn.execute('DELETE FROM files')
+            conn.execute('DELETE FROM chunks')
+            self.set_meta(conn, embedder=embedder, dim=dim, rows=0, generation=generation + 1, version=version + 1)
+        self.remove_stale_vector_files(generation + 1)
+
+    def remove_stale_vector_files(self, generation):
+        for name in os.listdir(self.directory):
+            if name.startswith('vectors-') and name != os.path.basename(self.vectors_path(generation)):
+                os.remove(os.path.join(self.directory, name))
+
+    # -- writes -----------------------------------------------------------------------------
+
+    def add(self, filename, digest, text, size=0, mtime=0.0):
+        # Indexes one file; content that is already indexed under another name is not embedded again
+        from ranking import embedder_name, embed_texts
+
+        with self.lock:
+            conn = self.connect()
+            if self.state()[0] != embedder_name():
+                self.reset(embedder_name(), embed_texts(['']).shape[1])
+            embedder, dim, rows, generation, version = self.state()
+            known = conn.execute('SELECT 1 FROM chunks WHERE digest = ? LIMIT 1', (digest,)).fetchone()
+
+            if known:
+                # Same content, same vectors: chunks flagged as deleted are brought back rather than embedded again
+                with conn:
+                    conn.execute('UPDATE chunks SET deleted = 0 WHERE digest = ?', (digest,))
+                    conn.execute('INSERT OR REPLACE INTO files (filename, digest, size, mtime) VALUES (?, ?, ?, ?)',
+                                 (filename, digest, size, mtime))
+                    self.set_meta(conn, version=version + 1)
+                return False
+
+            vectors = embed_texts(chunk_text(text) or [''])
+            self.write_vectors(generation, dim, rows, vectors)
+            # Rows are committed after the vectors are on disk; a crash in between only leaves unused space
+            with conn:
+                conn.executemany('INSERT INTO chunks (row, digest) VALUES (?, ?)',
+                                 [(rows + offset, digest) for offset in range(len(vectors))])
+                conn.execute('INSERT OR REPLACE INTO files (filename, digest, size, mtime) VALUES (?, ?, ?, ?)',
+                             (filename, digest, size, mtime))
+                self.set_meta(conn, rows=rows + len(vectors), version=version + 1)
+            return True
+
+    def write_vectors(self, generation, dim, rows, vectors):
+        import numpy as np
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.vectors_path(generation)
+        capacity = os.path.getsize(path) // (dim * 4) if os.path.exists(path) else 0
+        if rows + len(vectors) > capacity:
+            # Grow geometrically so appends stay amortised O(1)
+            capacity = max(capacity * 2, rows + len(vectors), 1024)
+            with open(path, 'ab') as file:
+                file.truncate(capacity * dim * 4)
+        stored = np.memmap(path, dtype=np.float32, mode='r+', shape=(capacity, dim))
+        stored[rows:rows + len(vectors)] = vectors
+        stored.flush()
+        del stored
+
+    def remove(self, filename):
+        with self.lock:
+            conn = self.connect()
+            row = conn.execute('SELECT digest FROM files WHERE filename = ?', (filename,)).fetchone()
+            if row is None:
+                return False
+            version = self.state()[4]
+            with conn:
+                conn.execute('DELETE FROM files WHERE filename = ?', (filename,))
+                # The chunks stay as long as another file has the same content
+                if not conn.execute('SELECT 1 FROM files WHERE digest = ? LIMIT 1', row).fetchone():
+                    conn.execute('UPDATE chunks SET deleted = 1 WHERE digest = ?', row)
+                self.set_meta(conn, version=version + 1)
+            return True
+
+    def compact(self, force=False):
+        # Rewrites the live vectors into a new file once enough of the current one is dead
+        with self.lock:
+            conn = self.connect()
+            embedder, dim, rows, generation, version = self.state()
+            dead = conn.execute('SELECT COUNT(*) FROM chunks WHERE deleted = 1').fetchone()[0]
+            if not dead or (not force and dead < rows * COMPACT_RATIO):
+                return False
+
+            live = conn.execute('SELECT row, digest FROM chunks WHERE deleted = 0 ORDER BY row').fetchall()
+            old_vectors = self.open_vectors(generation, dim, rows)
+            if live:
+                self.write_vectors(generation + 1, dim, 0, old_vectors[[row for row, _ in live]])
+            del old_vectors
+            with conn:
+                conn.execute('DELETE FROM chunks')
+                conn.executemany('INSERT INTO chunks (row, digest) VALUES (?, ?)',
+                                 [(new_row, digest) for new_row, (_, digest) in enumerate(live)])
+                self.set_meta(conn, rows=len(live), generation=generation + 1, version=version + 1)
+            self.remove_stale_vector_files(generation + 1)
+            return True
+
+    def sync(self, folder, backend=None):
+        # Brings the index in line with the folder: new or changed files are added, missing ones removed.
+        # Unchanged files are recognised by size and mtime, so a sync without changes parses nothing.
+        from utils import load_document, RESUME_EXTENSIONS
+
+        with self.sync_lock:
+            indexed = {filename: (size, mtime) for filename, size, mtime in
+                       self.connect().execute('SELECT filename, size, mtime FROM files')}
+            present = {}
+            for filename in os.listdir(folder) if os.path.isdir(folder) else []:
+                if filename.lower().endswith(RESUME_EXTENSIONS):
+                    stat = os.stat(os.path.join(folder, filename))
+                    present[filename] = (stat.st_size, stat.st_mtime)
+
+            added = removed = 0
+            for filename in indexed.keys() - present.keys():
+                removed += self.remove(filename)
+            for filename, (size, mtime) in present.items():
+                if indexed.get(filename) == (size, mtime):
+                    continue
+                path = os.path.join(folder, filename)
+                if filename in indexed:
+                    self.remove(filename)
+                document = load_document(path, backend=backend)
+                self.add(filename, file_digest(path), document["cleaned_text"], size=size, mtime=mtime)
+                added += 1
+
+            self.compact()
+            return {"added": added, "removed": removed, "indexed": len(present)}
+
+    # -- reads ------------------------------------------------------------------------------
+
+    def load(self):
+        # Maps the vector file and the row -> resume table once per index version
+        import numpy as np
+
+        embedder, dim, rows, generation, version = self.state()
+        if version == self.loaded_version:
+            return
+        # Vectors are looked up by their stored row, so rows without a chunk (space left by an
+        # interrupted add) never shift the labels of the rows after them
+        chunks = self.connect().execute('SELECT row, digest, deleted FROM chunks ORDER BY row').fetchall()
+        self.vectors = self.open_vectors(generation, dim, rows)
+        self.doc_codes = np.zeros(len(self.vectors), dtype=np.int64)
+        self.live = np.zeros(len(self.vectors), dtype=bool)
+        self.doc_digests = np.zeros(0, dtype=object)
+        chunks = [chunk for chunk in chunks if chunk[0] < len(self.vectors)]
+        if chunks:
+            self.doc_digests, codes = np.unique(np.array([digest for _, digest, _ in chunks], dtype=object), return_inverse=True)
+            positions = np.array([row for row, _, _ in chunks], dtype=np.int64)
+            self.doc_codes[positions] = codes
+            self.live[positions] = [not deleted for _, _, deleted in chunks]
+        self.loaded_version = version
+
+    def search(self, text, top_n=10):
+        # Top resumes for a query, best chunk per resume, as [{"filenames", "digest", "score"}]
+        import numpy as np
+        from ranking import embedder_name, embed_texts
+
+        with self.lock:
+            self.load()
+            if not len(self.vectors) or self.state()[0] != embedder_name():
+                return []
+            query = embed_texts([text])[0]
+            scores = np.asarray(self.vectors @ query)
+
+            best = np.full(len(self.doc_digests), -np.inf, dtype=np.float32)
+            np.maximum.at(best, self.doc_codes[self.live], scores[self.live])
+            candidates = np.flatnonzero(np.isfinite(best))
+            top = candidates[np.argsort(-best[candidates], kind='stable')[:top_n]]
+
+            conn = self.connect()
+            results = []
+            for code in top:
+                digest = self.doc_digests[code]
+                filenames = sorted(name for (name,) in conn.execute('SELECT filename FROM files WHERE digest = ?', (digest,)))
+                results.append({"filenames": filenames, "digest": digest, "score": round(float(best[code]), 4)})
+            return results
+
+    def stats(self):
+        embedder, dim, rows, generation, version = self.state()
+        conn = self.connect()
+        return {
+            "embedder": embedder,
+            "dim": dim,
+            "files": conn.execute('SELECT COUNT(*) FROM files').fetchone()[0],
+            "chunks": conn.execute('SELECT COUNT(*) FROM chunks WHERE deleted = 0').fetchone()[0],
+            "deleted_chunks": conn.execute('SELECT COUNT(*) FROM chunks WHERE deleted = 1').fetchone()[0],
+        }
@@ -0,0 +1,35 @@
+from pydantic import BaseModel, Field, field_validator
+
+
+class ResumeEvaluation(BaseModel):
+    # Schema of the single-pass response; field names match the Excel columns
+    name: str = Field("Not mentioned", alias="Name")
+    location: str = Field("Not mentioned", alias="Location")
+    phone: str = Field("Not mentioned", alias="Phone")
+    experience: str = Field("Not mentioned", alias="Experience")
+    fitment_summary: str = Field("Not mentioned", alias="Fitment Summary")
+    score: int | None = Field(None, alias="Score")
+    skills: dict[str, str] = Field(default_factory=dict, alias="Skills")
+
+    @field_validator("name", "location", "phone", "experience", "fitment_summary", mode="before")
+    @classmethod
+    def stringify(cls, value):
+        # phi3 often returns phone numbers and years of experience as JSON numbers
+        if value is None or value == "":
+            return "Not mentioned"
+        return value if isinstance(value, str) else str(value)
+
+    @field_validator("score", mode="before")
+    @classmethod
+    def clamp_score(cls, value):
+        try:
+            return min(100, max(0, int(float(value))))
+        except (TypeError, ValueError):
+            return None
+
+    @field_validator("skills", mode="before")
+    @classmethod
+    def stringify_skills(cls, value):
+        if not isinstance(value, dict):
+            return {}
+        return {str(skill): evaluation if isinstance(evaluation, str) else str(evaluation) for skill, evaluation in value.items()}
@@ -0,0 +1,114 @@
+import os
+import re
+from cleaning import clean_text
+
+# Headings recognised in resumes, by section. Matched against whole lines (case-insensitive,
+# trailing colon optional) or as a "Heading: content" prefix.
+SECTION_HEADINGS = {
+    "summary": ("summary", "professional summary", "profile", "profile summary", "career objective", "objective", "about me"),
+    "experience": ("experience", "work experience", "professional experience", "employment", "employment history",
+                   "work history", "internships", "internship", "internship experience"),
+    "skills": ("skills", "technical skills", "key skills", "skill set", "skills and tools", "core competencies",
+               "technologies", "tech skills", "hard skills", "soft skills", "skills summary", "technical proficiency"),
+    "education": ("education", "academic summary", "academics", "academic background", "qualifications",
+                  "educational qualifications"),
+    "projects": ("projects", "project", "project details", "academic projects", "personal projects", "key projects"),
+    "certifications": ("certifications", "certificates", "courses", "licenses and certifications"),
+    "achievements": ("achievements", "awards", "honors", "accomplishments", "extracurricular activities",
+                     "positions of responsibility", "leadership"),
+    "other": ("personal details", "personal information", "hobbies", "interests", "declaration", "references"),
+}
+HEADING_SECTIONS = {alias: section for section, aliases in SECTION_HEADINGS.items() for alias in aliases}
+
+# The only sections each prompt gets, most important first; the rest of the resume is left out.
+# "header" is the text above the first heading (name, contact details). A resume with none of a
+# stage's sections gets its whole text instead.
+STAGE_SECTIONS = {
+    "bulk_info": ("header", "summary", "experience"),
+    "score": ("summary", "experience", "skills", "projects", "education"),
+    "skills": ("skills", "experience", "projects", "certifications"),
+    "single_pass": ("header", "summary", "experience", "skills", "projects", "education", "certifications"),
+}
+# Resume tokens allowed per prompt, about the 90th percentile of its sections' combined length in
+# sample resumes; RESUME_TOKEN_BUDGET overrides every stage (0 = no limit)
+STAGE_TOKEN_BUDGETS = {"bulk_info": 800, "score": 1000, "skills": 900, "single_pass": 1600}
+RESUME_TOKEN_BUDGET = os.environ.get('RESUME_TOKEN_BUDGET')
+
+HEADING_PATTERN = re.compile(r'^[\s•●▪\uf0b7\-*]*([A-Za-z&/ ]{3,40}?)\s*:?\s*$')
+HEADING_PREFIX_PATTERN = re.compile(r'^[\s•●▪\uf0b7\-*]*([A-Za-z&/ ]{3,40}?)\s*:\s*(\S.*)$')
+# Rough BPE estimate: a token per punctuation mark and per up-to-four-letter piece of a word.
+# It errs on the high side for English, which keeps budgets safe without loading a tokenizer.
+TOKEN_PIECE_PATTERN = re.compile(r'\w{1,4}|[^\w\s]')
+
+
+def count_tokens(text):
+    return len(TOKEN_PIECE_PATTERN.findall(text))
+
+
+def heading_section(name):
+    return HEADING_SECTIONS.get(' '.join(name.lower().replace('&', 'and').split()))
+
+
+def split_sections(raw_text):
+    # {section: text} from the raw (not yet cleaned) text, which still has its line breaks.
+    # Repeated headings are merged; text before the first heading is the "header".
+    sections = {"header": []}
+    current = "header"
+    for line in raw_text.splitlines():
+        heading = HEADING_PATTERN.match(line)
+        if heading and heading_section(heading.group(1)):
+            current = heading_section(heading.group(1))
+            sections.setdefault(current, [])
+            continue
+        prefixed = HEADING_PREFIX_PATTERN.match(line)
+        if prefixed and heading_section(prefixed.group(1)):
+            current = heading_section(prefixed.group(1))
+            line = prefixed.group(2)
+        sections.setdefault(current, []).append(line)
+    return {section: '\n'.join(lines) for section, lines in sections.items() if any(line.strip() for line in lines)}
+
+
+def truncate_to_budget(text, budget):
+    if not budget or count_tokens(text) <= budget:
+        return text
+    kept, used = [], 0
+    for word in text.split(' '):
+        used += count_tokens(word)
+        if used > budget:
+            break
+        kept.append(word)
+    return ' '.join(kept)
+
+
+def stage_budget(stage):
+    return int(RESUME_TOKEN_BUDGET) if RESUME_TOKEN_BUDGET is not None else STAGE_TOKEN_BUDGETS[stage]
+
+
+def build_context(sections, stage, budget=None):
+    # Cleaned resume text for one prompt: the stage's sections in priority order, within the budget
+    budget = stage_budget(stage) if budget is None else budget
+    order = [section for section in STAGE_SECTIONS[stage] if section in sections]
+    if not order:
+        # None of the stage's sections found (e.g. no headings at all): fall back to the whole resume
+        order = list(sections)
+
+    parts, remaining = [], budget
+    for section in order:
+        text = clean_text(sections[section])
+        if section != "header":
+            text = f"{section.upper()}: {text}"
+        part = truncate_to_budget(text, remaining) if budget else text
+        if part:
+            parts.append(part)
+        if budget:
+            remaining -= count_tokens(part)
+            if remaining <= 0:
+                break
+    return '\n'.join(parts)
+
+
+def build_contexts(raw_text):
+    # Per-prompt resume contexts and their token counts
+    sections = split_sections(raw_text or "")
+    contexts = {stage: build_context(sections, stage) for stage in STAGE_SECTIONS}
+    return contexts, {stage: count_tokens(context) for stage, context in contexts.items()}
@@ -0,0 +1,30 @@
+import pytest
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # The app keeps its data folders relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    import app
+    app.app.config['TESTING'] = True
+    return app, app.app.test_client()
+
+
+@pytest.mark.parametrize('top_n', ['abc', '1.5', '[]'])
+def test_search_rejects_top_n_that_is_not_a_number(client, top_n):
+    _, test_client = client
+    response = test_client.post(f'/api/resumes/search?top_n={top_n}', json={"job_description": "python developer"})
+    assert response.status_code == 400
+    assert response.json['status'] == 'error'
+
+
+@pytest.mark.parametrize('top_n, expected', [(0, 10), (-5, 1), (10000, 100), (7, 7)])
+def test_search_clamps_top_n(client, monkeypatch, top_n, expected):
+    app, test_client = client
+    requested = []
+    monkeypatch.setattr(app, 'clean_text', lambda text: text)
+    monkeypatch.setattr(app.resume_index, 'search', lambda text, top_n: requested.append(top_n) or [])
+
+    response = test_client.post('/api/resumes/search', json={"job_description": "python developer", "top_n": top_n})
+    assert response.status_code == 200
+    assert requested == [expected]
@@ -0,0 +1,36 @@
+import hashlib
+from resume_index import ResumeIndex
+
+
+def digest(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def resume(number):
+    return f"candidate{number} resume with term{number} python machine learning"
+
+
+def test_search_labels_after_remove_add_and_readd(tmp_path):
+    index = ResumeIndex(str(tmp_path / 'index'))
+    for number in range(8):
+        index.add(f'r{number}.txt', digest(resume(number)), resume(number))
+
+    index.remove('r0.txt')
+    new_text = "new candidate with uniqueterm golang kubernetes"
+    index.add('new.txt', digest(new_text), new_text)
+    index.add('r0.txt', digest(resume(0)), resume(0))
+
+    assert index.search('uniqueterm golang', top_n=1)[0]['filenames'] == ['new.txt']
+    assert index.search('candidate0 term0', top_n=1)[0]['filenames'] == ['r0.txt']
+    for number in range(1, 8):
+        assert index.search(f'candidate{number} term{number}', top_n=1)[0]['filenames'] == [f'r{number}.txt']
+
+
+def test_removed_resumes_are_not_returned(tmp_path):
+    index = ResumeIndex(str(tmp_path / 'index'))
+    for number in range(3):
+        index.add(f'r{number}.txt', digest(resume(number)), resume(number))
+    index.remove('r1.txt')
+
+    filenames = [name for result in index.search('python machine learning', top_n=10) for name in result['filenames']]
+    assert sorted(filenames) == ['r0.txt', 'r2.txt']
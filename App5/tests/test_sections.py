@@ -0,0 +1,37 @@
+from sections import build_contexts, split_sections, build_context
+
+RESUME = """Jane Doe
+jane@example.com | +91 98765 43210
+SUMMARY
+Data scientist with five years of forecasting work
+EXPERIENCE
+Acme Analytics, Data Scientist, 2019 - 2024
+SKILLS
+Python, SQL, PyTorch
+PROJECTS
+Demand forecasting dashboard
+EDUCATION
+B.Tech Computer Science
+CERTIFICATIONS
+AWS Machine Learning Specialty
+HOBBIES
+Chess and hiking
+"""
+
+
+def test_stages_only_get_their_sections():
+    contexts, tokens = build_contexts(RESUME)
+
+    assert len({contexts['bulk_info'], contexts['score'], contexts['skills']}) == 3
+    assert 'jane@example.com' in contexts['bulk_info'] and 'PyTorch' not in contexts['bulk_info']
+    assert 'PyTorch' in contexts['skills'] and 'jane@example.com' not in contexts['skills']
+    assert 'B.Tech' in contexts['score'] and 'B.Tech' not in contexts['skills']
+    assert all('Chess' not in context for context in contexts.values())
+    assert tokens['bulk_info'] < tokens['single_pass']
+
+
+def test_stage_without_its_sections_gets_the_whole_resume():
+    sections = split_sections("Jane Doe\nPython developer\nHOBBIES\nChess")
+
+    context = build_context(sections, 'skills')
+    assert 'Python developer' in context and 'Chess' in context
@@ -0,0 +1,41 @@
+import io
+import os
+import hashlib
+from uploads import BlobStore, ResumeIntake
+
+BOUNDARY = b'boundary'
+
+
+def multipart(*files):
+    body = b''
+    for filename, content in files:
+        body += (b'--' + BOUNDARY + b'\r\nContent-Disposition: form-data; name="resumes"; filename="'
+                 + filename.encode() + b'"\r\n\r\n' + content + b'\r\n')
+    return io.BytesIO(body + b'--' + BOUNDARY + b'--\r\n')
+
+
+def upload(blobs, resume_folder, *files):
+    return ResumeIntake(blobs, resume_folder).consume(multipart(*files), BOUNDARY)
+
+
+def blob_names(blobs):
+    return sorted(name for _, _, names in os.walk(blobs.directory) for name in names)
+
+
+def test_replacing_a_file_drops_its_old_blob(tmp_path):
+    blobs, resume_folder = BlobStore(str(tmp_path / 'blobs')), str(tmp_path / 'resumes')
+    upload(blobs, resume_folder, ('cv.pdf', b'%PDF first version'))
+    upload(blobs, resume_folder, ('cv.pdf', b'%PDF second version'))
+
+    with open(os.path.join(resume_folder, 'cv.pdf'), 'rb') as file:
+        assert file.read() == b'%PDF second version'
+    assert blob_names(blobs) == [hashlib.sha256(b'%PDF second version').hexdigest()]
+
+
+def test_replacing_a_file_keeps_a_blob_still_linked_under_another_name(tmp_path):
+    blobs, resume_folder = BlobStore(str(tmp_path / 'blobs')), str(tmp_path / 'resumes')
+    upload(blobs, resume_folder, ('cv.pdf', b'%PDF shared'))
+    os.link(os.path.join(resume_folder, 'cv.pdf'), os.path.join(resume_folder, 'copy.pdf'))
+    upload(blobs, resume_folder, ('cv.pdf', b'%PDF new'))
+
+    assert blob_names(blobs) == sorted(hashlib.sha256(content).hexdigest() for content in (b'%PDF shared', b'%PDF new'))
@@ -0,0 +1,180 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import zipfile
+from werkzeug.utils import secure_filename
+from cache import file_digest
+from utils import RESUME_EXTENSIONS
+
+# Bytes read from the request body, or from a zip member, at a time
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobWriter:
+    # One file being written into the blob store. The SHA-256 is computed while the chunks
+    # arrive, so the content never has to be read back to find its address.
+
+    def __init__(self, store):
+        self.store = store
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        os.makedirs(store.directory, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(dir=store.directory, suffix='.part')
+        self.file = os.fdopen(fd, 'wb')
+
+    def write(self, chunk):
+        self.sha256.update(chunk)
+        self.file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self):
+        # Moves the file to its content address; content that is already stored is kept once
+        self.file.close()
+        digest = self.sha256.hexdigest()
+        path = self.store.path(digest)
+        if os.path.exists(path):
+            os.remove(self.temp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self.temp_path, path)
+        return digest
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+class BlobStore:
+    # Uploaded files stored once per content under their SHA-256
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def writer(self):
+        return BlobWriter(self)
+
+
+class ResumeIntake:
+    # Reads a multipart upload of resumes and zip archives of resumes straight from the request
+    # stream. Each file is written to the blob store as its chunks arrive and linked into the
+    # resume folder under its name as soon as it is complete, at which point on_file(path, digest)
+    # is called, e.g. to start extracting its text.
+
+    def __init__(self, blob_store, resume_folder, on_file=None, field_name='resumes'):
+        self.blobs = blob_store
+        self.resume_folder = resume_folder
+        self.on_file = on_file
+        self.field_name = field_name
+        self.saved = []
+        self.duplicates = []
+        self.skipped = []
+
+    def consume(self, stream, boundary):
+        from werkzeug.sansio.multipart import MultipartDecoder, File, Data, Epilogue, NeedData
+
+        decoder = MultipartDecoder(boundary)
+        writer, filename, finished = None, None, False
+        try:
+            while True:
+                event = decoder.next_event()
+                if isinstance(event, NeedData):
+                    if finished:
+                        raise ValueError("The upload ended before the last file was complete.")
+                    chunk = stream.read(CHUNK_SIZE)
+                    finished = not chunk
+                    decoder.receive_data(chunk or None)
+                elif isinstance(event, File) and event.name == self.field_name and event.filename:
+                    writer, filename = self.blobs.writer(), event.filename
+                elif isinstance(event, Data) and writer is not None:
+                    writer.write(event.data)
+                    if not event.more_data:
+                        digest = writer.commit()
+                        writer = None
+                        self.add_upload(filename, digest)
+                elif isinstance(event, Epilogue):
+                    break
+        finally:
+            if writer is not None:
+                writer.abort()
+        return self.summary()
+
+    def add_upload(self, filename, digest):
+        if filename.lower().endswith('.zip'):
+            # The archive is only a container; its members are stored and it is not kept
+            archive_path = self.blobs.path(digest)
+            try:
+                self.extract_zip(archive_path)
+            except zipfile.BadZipFile:
+                self.skipped.append(filename)
+            finally:
+                os.remove(archive_path)
+        else:
+            self.add_file(filename, digest)
+
+    def extract_zip(self, archive_path):
+        # Members are copied out one chunk at a time, so neither the archive nor a member is held in memory
+        with zipfile.ZipFile(archive_path) as archive:
+            for member in archive.infolist():
+                if member.is_dir():
+                    continue
+                name = os.path.basename(member.filename)
+                if name.startswith('.') or '__MACOSX' in member.filename or not name.lower().endswith(RESUME_EXTENSIONS):
+                    self.skipped.append(member.filename)
+                    continue
+                writer = self.blobs.writer()
+                try:
+                    with archive.open(member) as source:
+                        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                            writer.write(chunk)
+                except Exception:
+                    writer.abort()
+                    raise
+                self.add_file(name, writer.commit())
+
+    def add_file(self, filename, digest):
+        filename = secure_filename(os.path.basename(filename))
+        blob_path = self.blobs.path(digest)
+        if not filename.lower().endswith(RESUME_EXTENSIONS):
+            # Not kept; the blob goes too unless the same content is in the folder as a resume
+            if os.stat(blob_path).st_nlink == 1:
+                os.remove(blob_path)
+            self.skipped.append(filename)
+            return
+
+        target = os.path.join(self.resume_folder, filename)
+        if os.path.exists(target) and os.path.samefile(target, blob_path):
+            self.duplicates.append(filename)
+            return
+        # The resume folder holds hard links to the blobs, so a blob with more than one link is
+        # already in the folder under another name
+        if os.stat(blob_path).st_nlink > 1:
+            self.duplicates.append(filename)
+            return
+
+        os.makedirs(self.resume_folder, exist_ok=True)
+        if os.path.exists(target):
+            self.unlink(target)
+        try:
+            os.link(blob_path, target)
+        except OSError:
+            # No hard links on this file system; duplicates are then only caught by name
+            shutil.copyfile(blob_path, target)
+        self.saved.append(filename)
+        if self.on_file:
+            self.on_file(target, digest)
+
+    def unlink(self, path):
+        # Removes a file from the resume folder, and its blob once no other name links to it.
+        # Copies made without hard links are not tied to their blob and leave it alone.
+        old_blob = self.blobs.path(file_digest(path)) if os.stat(path).st_nlink > 1 else None
+        os.remove(path)
+        if old_blob and os.path.exists(old_blob) and os.stat(old_blob).st_nlink == 1:
+            os.remove(old_blob)
+
+    def summary(self):
+        return {"saved": self.saved, "duplicates": self.duplicates, "skipped": self.skipped}
@@ -1,133 +1,329 @@
-import pdfplumber
 import re
 import os
-import pandas as pd
 import time
-import nltk
-import docx2txt
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from tqdm import tqdm
-from langchain_ollama import OllamaLLM
-from langchain_core.prompts import ChatPromptTemplate
-from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
-
-# Download NLTK resources
-nltk.download('stopwords')
-from nltk.corpus import stopwords
-
-# Initialize the LLM model
-model = OllamaLLM(model="phi3")
-
-def clean_text(text):
-    if not text:
-        return ""
-    # Remove non-printable characters
-    text = ''.join(char for char in text if char.isprintable())
-    # Remove stopwords
-    stop_words = set(stopwords.words('english')).union(set(ENGLISH_STOP_WORDS))
-    return ' '.join(word for word in text.split() if word.lower() not in stop_words)
-
-def extract_text_from_file(file_path):
+from llm_client import get_llm, get_async_llm
+from cache import LLMCache, TextCache, file_digest
+from cleaning import clean_text
+from contacts import extract_contacts, resolved_contacts
+from sections import build_contexts, count_tokens
+from results_store import ResultsStore, results_store_path
+from ranking import similarity_scores, select_candidates, embedding_backend
+from prompts import get_prompt, prompt_versions, bulk_info_inputs, BULK_INFO_FIELDS, prefill_stats
+from registry import ResumeRegistry, ScreeningContext, context_key
+
+# Heavy dependencies (pandas, pdfplumber, pypdfium2, docx2txt, langchain, pydantic, NLTK) are
+# imported inside the functions that need them, so importing this module stays cheap for Flask
+# startup and for every spawned parse worker. Check with: python benchmarks/import_time.py
+
+# Persistent cache of LLM responses; re-screening identical inputs only costs lookups
+llm_cache = LLMCache(
+    os.environ.get('LLM_CACHE_PATH', os.path.join('data', 'cache', 'llm_responses.sqlite')),
+    max_bytes=int(os.environ.get('LLM_CACHE_MAX_MB', 256)) * 1024 * 1024,
+    enabled=os.environ.get('LLM_CACHE', '1') == '1',
+)
+
+# Parsed resume text keyed by file content, shared by duplicate uploads and re-runs
+text_cache = TextCache(
+    os.environ.get('TEXT_CACHE_PATH', os.path.join('data', 'cache', 'texts.sqlite')),
+    enabled=os.environ.get('TEXT_CACHE', '1') == '1',
+)
+
+# Resume digests by path and the rows each digest was screened into, so renamed or re-uploaded
+# resumes are not screened again
+resume_registry = ResumeRegistry(
+    os.environ.get('RESUME_REGISTRY_PATH', os.path.join('data', 'cache', 'registry.sqlite')),
+    enabled=os.environ.get('RESUME_REGISTRY', '1') == '1',
+)
+# File types screened as resumes. Uploads, the folder watcher and the resume index take only these.
+RESUME_EXTENSIONS = ('.pdf',)
+# Prompts behind a screening row, by single_pass
+SCREENING_PROMPTS = {False: ('job_role', 'bulk_info', 'score', 'skills'), True: ('job_role', 'single_pass')}
+# Resumes the serial path screens together, one prompt template at a time
+PROMPT_GROUP_SIZE = int(os.environ.get('PROMPT_GROUP_SIZE', 8))
+
+def model_name(model):
+    # JSON mode changes the output, so it is part of the cache identity of a model
+    name = getattr(model, 'model', type(model).__name__)
+    output_format = getattr(model, 'format', '')
+    return f"{name}:{output_format}" if output_format else name
+
+def invoke_prompt(template_id, inputs, model=None):
+    # Prompts are sent as plain strings, so consecutive requests share the job-constant prefix
+    # byte for byte and Ollama can reuse its KV cache for it
+    model = model or get_llm()
+    prompt = get_prompt(template_id)
+    rendered = prompt.render(inputs)
+    key = llm_cache.make_key(model_name(model), prompt.cache_id, rendered)
+    response = llm_cache.get(key)
+    if response is None:
+        generation = model.generate([rendered]).generations[0][0]
+        prefill_stats.record(template_id, generation.generation_info)
+        response = generation.text
+        llm_cache.put(key, model_name(model), prompt.cache_id, response)
+    return response
+
+async def ainvoke_prompt(template_id, inputs, model=None, semaphore=None):
+    model = model or get_async_llm()
+    prompt = get_prompt(template_id)
+    rendered = prompt.render(inputs)
+    key = llm_cache.make_key(model_name(model), prompt.cache_id, rendered)
+    response = llm_cache.get(key)
+    if response is not None:
+        return response
+
+    # The semaphore is shared by every resume in the batch and caps in-flight requests to Ollama
+    if semaphore is None:
+        result = await model.agenerate([rendered])
+    else:
+        async with semaphore:
+            result = await model.agenerate([rendered])
+    generation = result.generations[0][0]
+    prefill_stats.record(template_id, generation.generation_info)
+    response = generation.text
+    llm_cache.put(key, model_name(model), prompt.cache_id, response)
+    return response
+
+URL_PATTERN = re.compile(r'(https?://[^\s]+|www\.[^\s]+)')
+
+# PDF text backend used when none is passed explicitly: "pdfium" (fast, falls back to pdfplumber) or "pdfplumber"
+PDF_BACKEND = os.environ.get('PDF_BACKEND', 'pdfium')
+# pdfium output with fewer letters than this among its non-space characters is treated as unusable
+MIN_LETTER_RATIO = 0.5
+
+def read_pdf_pdfplumber(file_path):
+    # Opens the PDF once and runs layout analysis once per page, returning the text,
+    # the link annotations and basic page metadata from that single parse
+    import pdfplumber
+
+    pages, annotation_links = [], []
+    with pdfplumber.open(file_path) as pdf:
+        for page in pdf.pages:
+            pages.append({
+                "number": page.page_number,
+                "width": page.width,
+                "height": page.height,
+                "text": page.extract_text() or "",
+            })
+            for annot in page.annots or []:
+                if annot.get('uri'):
+                    annotation_links.append(annot['uri'])
+    return {
+        "text": ''.join(page["text"] for page in pages),
+        "pages": pages,
+        "links": annotation_links,
+    }
+
+def pdfium_page_links(pdf, page):
+    # pypdfium2 has no helper for link annotations, so walk them through the raw PDFium API
+    import ctypes
+    import pypdfium2.raw as pdfium_c
+
+    links = []
+    for index in range(pdfium_c.FPDFPage_GetAnnotCount(page.raw)):
+        annot = pdfium_c.FPDFPage_GetAnnot(page.raw, index)
+        try:
+            if pdfium_c.FPDFAnnot_GetSubtype(annot) != pdfium_c.FPDF_ANNOT_LINK:
+                continue
+            action = pdfium_c.FPDFLink_GetAction(pdfium_c.FPDFAnnot_GetLink(annot))
+            if not action or pdfium_c.FPDFAction_GetType(action) != pdfium_c.PDFACTION_URI:
+                continue
+            length = pdfium_c.FPDFAction_GetURIPath(pdf.raw, action, None, 0)
+            buffer = ctypes.create_string_buffer(length)
+            pdfium_c.FPDFAction_GetURIPath(pdf.raw, action, buffer, length)
+            uri = buffer.value.decode('utf-8', errors='replace')
+            if uri:
+                links.append(uri)
+        finally:
+            pdfium_c.FPDFPage_CloseAnnot(annot)
+    return links
+
+def read_pdf_pdfium(file_path):
+    import pypdfium2 as pdfium
+
+    pages, annotation_links = [], []
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        for index in range(len(pdf)):
+            page = pdf[index]
+            width, height = page.get_size()
+            textpage = page.get_textpage()
+            # PDFium uses CRLF line breaks and marks hyphenated line breaks with \x02
+            text = textpage.get_text_bounded().replace('\r\n', '\n').replace('\x02', '-')
+            pages.append({"number": index + 1, "width": width, "height": height, "text": text})
+            annotation_links.extend(pdfium_page_links(pdf, page))
+            textpage.close()
+            page.close()
+    finally:
+        pdf.close()
+    return {
+        "text": ''.join(page["text"] for page in pages),
+        "pages": pages,
+        "links": annotation_links,
+    }
+
+def looks_degenerate(text):
+    # Empty output, or mostly symbols/garbage glyphs from a broken font mapping
+    characters = [char for char in text if not char.isspace()]
+    if not characters:
+        return True
+    letters = sum(char.isalpha() for char in characters)
+    return letters / len(characters) < MIN_LETTER_RATIO
+
+def read_pdf(file_path, backend=None):
+    backend = backend or PDF_BACKEND
+    if backend == 'pdfplumber':
+        return read_pdf_pdfplumber(file_path)
+    if backend != 'pdfium':
+        raise ValueError(f"Unknown PDF backend: {backend}")
+
+    import pypdfium2 as pdfium
+
+    try:
+        pdf = read_pdf_pdfium(file_path)
+    except pdfium.PdfiumError as e:
+        print(f"-- pdfium could not read {file_path}: {e}")
+        return read_pdf_pdfplumber(file_path)
+    if looks_degenerate(pdf["text"]):
+        return read_pdf_pdfplumber(file_path)
+    return pdf
+
+def parse_document(file_path, backend=None):
     ext = Path(file_path).suffix.lower()
     if ext == '.pdf':
-        with pdfplumber.open(file_path) as pdf:
-            text = ''.join([page.extract_text() for page in pdf.pages if page.extract_text()])
-    elif ext == '.docx':
-        text = docx2txt.process(file_path)
-    elif ext == '.txt':
-        with open(file_path, 'r', encoding='utf-8') as file:
-            text = file.read()
+        pdf = read_pdf(file_path, backend=backend)
+        raw_text = pdf["text"]
+        # URLs are searched page by page so a link cannot run into the next page's text
+        links = pdf["links"] + [url for page in pdf["pages"] for url in URL_PATTERN.findall(page["text"])]
+        page_count = len(pdf["pages"])
     else:
-        return ""
-    
-    return clean_text(text)
-
-def extract_role_score(resume_text, job_description, model=model):
-    data = {
-        "Role": "Not mentioned",
-        "Score": "Not generated"
-    }
-    if not resume_text:
-        return data
-    
-    prompt = """
-You are tasked with evaluating a candidate based on the provided resume and job description. Your task is to produce exactly two outputs: 
-
-1. **Role**: Based on the job description, identify which role this job description is targeted to. Use only one word or phrase for the role.
-2. **Score**: A numerical score (0-100) that represents how well the resume aligns with the job description.
-
-### Inputs:
-Resume Text: {resume_text}
-Job Description: {job_description}
-
-### Important Instructions:
-- ONLY use information from the job description to infer the role.
-- ONLY use the resume to determine how well the candidate fits the role (for scoring).
-- The **Role** must be a SINGLE word or phrase, with no additional details.
-- The **Score** must be a NUMBER between 0 and 100 based on the alignment between the resume and job description.
-- Return the result in this exact format with nothing else:
-
-Role: [SINGLE ROLE, in 2 words] 
-Score: [NUMBER]
-"""
-
-    prompt = ChatPromptTemplate.from_template(prompt)
-    chain = prompt | model
-    response = chain.invoke({
-        'resume_text': resume_text,
-        'job_description': job_description,
-    })
+        if ext == '.docx':
+            import docx2txt
+            raw_text = docx2txt.process(file_path) or ""
+        elif ext == '.txt':
+            with open(file_path, 'r', encoding='utf-8') as file:
+                raw_text = file.read()
+        else:
+            raw_text = ""
+        links = None
+        page_count = 1
+
+    cleaned_text = clean_text(raw_text)
+    if links is None:
+        links = URL_PATTERN.findall(cleaned_text)
+    return {"raw_text": raw_text, "cleaned_text": cleaned_text, "links": links, "page_count": page_count}
+
+def load_document(file_path, backend=None, digest=None):
+    # Parses the file only when its content has not been seen before. digest saves hashing
+    # the file again when the caller already knows its SHA-256.
+    ext = Path(file_path).suffix.lower()
+    if ext not in ('.pdf', '.docx', '.txt'):
+        return {"raw_text": "", "cleaned_text": "", "links": [], "page_count": 0}
+
+    # PDF backends produce slightly different text, so each one gets its own cache entry
+    cache_key = digest or file_digest(file_path)
+    if ext == '.pdf':
+        cache_key = f"{cache_key}:{backend or PDF_BACKEND}"
 
-    # Extract Role
+    document = text_cache.get(cache_key)
+    if document is None:
+        document = parse_document(file_path, backend=backend)
+        text_cache.put(cache_key, document)
+    return document
+
+def extract_text_from_file(file_path, backend=None):
+    return load_document(file_path, backend=backend)["cleaned_text"]
+
+def parse_role(response):
     role_match = re.search(r'Role:\s*(.*)', response)
-    if role_match:
-        data["Role"] = role_match.group(1).strip()
+    return role_match.group(1).strip() if role_match else "Not mentioned"
 
-    # Extract Score
+def parse_score(response):
     score_match = re.search(r'Score:\s*(\d+)', response)
-    if score_match:
-        data["Score"] = int(score_match.group(1))
-
-    return data
+    return int(score_match.group(1)) if score_match else "Not generated"
 
-def extract_bulk_info_llm(resume_text, model=model):
+def extract_score(resume_text, job_description, model=None):
     if not resume_text:
-        return {"Name": "Not mentioned", "Location": "Not mentioned", "Phone": "Not mentioned", "Experience": "Not mentioned", "Fitment Summary": "Not mentioned"}
-    
-    prompt = """
-You are given a resume and a job description. Your task is to strictly retrieve information from the resume text provided and not infer or generate any additional content. If the required information is not present in the resume, return "Not mentioned" without making any assumptions.
-
-Please extract and return the following information from the resume text:
-1. Name: (The exact name as written in the resume).
-2. Location: (The full address or location as mentioned in the resume).
-3. Phone Number: (The phone number as written in the resume).
-4. Total Experience in Years: (Extract the number of years of experience mentioned in the resume. If it's not directly specified, compute it and provide reasoning for the computed experience).
-5. Fitment Summary: (Summarize the relevant skills and experience found in the resume, but do not infer or add any extra details).
-Here is the resume text:
-{resume_text}
-
-Important:
-- Only retrieve information directly from the resume text.
-- If any required information is missing, mention "Not mentioned."
-- Do NOT infer or generate details.
-- Location and name might be grouped together, if grouped seperate them.
-- If total experience is not specified, try to compute it based on the resume.
-- Provide the output in the following format:
-
-Output:
-- Name: [Extracted Full Name]
-- Location: [Extracted Full Location]
-- Phone Number: [Extracted Phone Number]
-- Total Experience in Years: [Extracted Experience in Years]
-- Fitment Summary: [Extracted Fitment Summary]
-"""
-
-    prompt = ChatPromptTemplate.from_template(prompt)
-    chain = prompt | model
-    response = chain.invoke({
-        'resume_text': resume_text, 
-    })
+        return parse_score("")
 
+    response = invoke_prompt('score', {
+        'job_description': job_description,
+        'resume_text': resume_text,
+    }, model=model)
+    return parse_score(response)
+
+# Heading of the required-skills list in a job description, e.g. "Skill(s) required"
+JD_SKILLS_HEADING = re.compile(r'^\s*(?:skill\(s\) required|skills required|required skills|key skills|skills|must have|requirements)\s*:?\s*$', re.IGNORECASE)
+JD_KEYWORD_LIMIT = 15
+
+def extract_jd_keywords(raw_text):
+    # Required-skill keywords: the list under a skills heading when the JD has one (one skill per
+    # line or comma separated), otherwise the most frequent terms of the cleaned text
+    from collections import Counter
+
+    keywords = []
+    lines = raw_text.splitlines()
+    for position, line in enumerate(lines):
+        if not JD_SKILLS_HEADING.match(line):
+            continue
+        for offset, item in enumerate(lines[position + 1:], position + 2):
+            item = item.strip().strip('•-*').strip()
+            # The list ends at a blank or sentence-like line, or at the heading introducing the next paragraph
+            next_line = lines[offset].strip() if offset < len(lines) else ""
+            if not item or len(item.split()) > 5 or item.endswith(('.', ':')) or len(next_line.split()) > 5:
+                break
+            keywords.extend(part.strip() for part in item.split(',') if part.strip())
+        if keywords:
+            return list(dict.fromkeys(keywords))[:JD_KEYWORD_LIMIT]
+
+    counts = Counter(token.lower() for token in clean_text(raw_text).split() if token.isalpha() and len(token) > 2)
+    return [token for token, _ in counts.most_common(JD_KEYWORD_LIMIT)]
+
+class JobProfile:
+    # The job description processed once per job: cleaned text, its token count, required-skill
+    # keywords and the role it targets. Shared read-only by every resume of a batch.
+
+    def __init__(self, text, keywords, role="Not mentioned", digest=None):
+        self.digest = digest
+        self.text = text
+        self.tokens = count_tokens(text)
+        self.keywords = keywords
+        self.role = role
+
+    def to_dict(self):
+        return {"digest": self.digest, "role": self.role, "tokens": self.tokens, "keywords": self.keywords}
+
+def extract_job_role(job_description, model=None):
+    # The role depends only on the job description, so it is asked once per JD
+    if not job_description:
+        return "Not mentioned"
+    response = invoke_prompt('job_role', {'job_description': job_description}, model=model or get_llm())
+    return parse_role(response)
+
+# Job profiles keyed by the SHA-256 of the job description file; the role call behind a new
+# profile is also kept in the LLM response cache, so it survives restarts
+job_profiles = {}
+job_profiles_lock = threading.Lock()
+
+def load_job_profile(job_description_file, model=None):
+    if isinstance(job_description_file, JobProfile):
+        return job_description_file
+
+    digest = file_digest(job_description_file)
+    with job_profiles_lock:
+        profile = job_profiles.get(digest)
+    if profile is None:
+        document = load_document(job_description_file)
+        text = document["cleaned_text"]
+        profile = JobProfile(text, extract_jd_keywords(document["raw_text"]), extract_job_role(text, model=model), digest)
+        with job_profiles_lock:
+            job_profiles[digest] = profile
+    return profile
+
+def parse_bulk_info(response):
     # Parsing the response to extract key fields using regex
     extracted_info = {"Name": "Not mentioned", "Location": "Not mentioned", "Phone": "Not mentioned", "Experience": "Not mentioned", "Fitment Summary": "Not mentioned"}
 
@@ -158,159 +354,515 @@ Output:
 
     return extracted_info
 
-def extract_links(file_path):
-    github_links, linkedin_links = set(), set()
+def apply_contacts(extracted_info, contacts):
+    # Contact fields the rules resolved confidently replace whatever the LLM returned
+    if contacts:
+        extracted_info.update({name: value for name, value in resolved_contacts(contacts).items() if name in extracted_info})
+        extracted_info["Email"] = contacts["Email"]["value"] or "Not mentioned"
+    return extracted_info
 
-    ext = Path(file_path).suffix.lower()
-    if ext == '.pdf':
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if page.annots:
-                    for annot in page.annots:
-                        if 'uri' in annot:
-                            url = annot['uri']
-                            try:
-                                if 'github.com' in url:
-                                    github_links.add(url)
-                                elif 'linkedin.com' in url:
-                                    linkedin_links.add(url)
-                            except:
-                                continue
-                if text:
-                    urls = re.findall(r'(https?://[^\s]+|www\.[^\s]+)', text)
-                    for url in urls:
-                        if 'github.com' in url:
-                            github_links.add(url)
-                        elif 'linkedin.com' in url:
-                            linkedin_links.add(url)
-    else:
-        text = extract_text_from_file(file_path)
-        urls = re.findall(r'(https?://[^\s]+|www\.[^\s]+)', text)
-        for url in urls:
-            if 'github.com' in url:
-                github_links.add(url)
-            elif 'linkedin.com' in url:
-                linkedin_links.add(url)
-    
-    return list(github_links), list(linkedin_links)
+def bulk_info_fields(contacts):
+    # Fields still to ask the LLM for once the rule-based extractor has had its go
+    resolved = resolved_contacts(contacts) if contacts else {}
+    return tuple(name for name in BULK_INFO_FIELDS if name not in resolved)
 
-def extract_skills(resume_text, skills_file, model=model):
+def extract_bulk_info_llm(resume_text, model=None, contacts=None):
+    if not resume_text:
+        return apply_contacts(parse_bulk_info(""), contacts)
+
+    response = invoke_prompt('bulk_info', {
+        **bulk_info_inputs(bulk_info_fields(contacts)),
+        'resume_text': resume_text,
+    }, model=model)
+    return apply_contacts(parse_bulk_info(response), contacts)
 
-    extracted_data = {}
+def split_links(urls):
+    github_links, linkedin_links = set(), set()
+    for url in urls:
+        if 'github.com' in url:
+            github_links.add(url)
+        elif 'linkedin.com' in url:
+            linkedin_links.add(url)
 
+    # Sorted so the row is identical whichever process parsed the file
+    return sorted(github_links), sorted(linkedin_links)
+
+def extract_links(file_path, backend=None):
+    return split_links(load_document(file_path, backend=backend)["links"])
+
+def load_skills(skills_file):
     # Load skills from the provided Excel sheet
+    import pandas as pd
     skills_df = pd.read_excel(skills_file)
-    skills = skills_df['Skills'].tolist()
+    return skills_df['Skills'].tolist()
 
+def build_skills_prompt(skills):
     # Combine all skills into a single prompt to reduce the number of model calls
     skills_prompt = "Evaluate the candidate's proficiency in the following skills: \n"
     skills_prompt += "\n".join([f"- {skill}" for skill in skills])
-
-    prompt_template = """
-    Candidate Resume:
-    {resume_text}
-
-    {skills_prompt}
-
-    For each skill, provide a brief evaluation in 50-100 words or say 'Not mentioned' if the skill is not mentioned in the resume.
-    """
+    return skills_prompt
+
+class EvaluationTemplate:
+    # The skills sheet parsed once: the skills list, the rendered prompt fragments and a
+    # precompiled response pattern per skill. Shared read-only by every worker of a job.
+
+    def __init__(self, skills, digest=None):
+        self.digest = digest
+        self.skills = skills
+        self.skills_prompt = build_skills_prompt(skills)
+        self.skills_list = "\n".join([f"- {skill}" for skill in skills])
+        self.skill_patterns = [
+            (skill, re.compile(rf"{re.escape(str(skill))}:?\s*(.*)", re.IGNORECASE)) for skill in skills
+        ]
+
+    def parse_skills(self, skills_response):
+        extracted_data = {}
+
+        # Parse the model response to extract skill-based observations
+        for skill, skill_pattern in self.skill_patterns:
+            # Search for the evaluation of each skill in the response
+            skill_match = skill_pattern.search(skills_response)
+
+            # Assign the extracted observation to the skill, or 'Not mentioned' if not found
+            extracted_data[skill] = skill_match.group(1).strip() if skill_match else "Not mentioned"
+
+        return extracted_data
+
+# Parsed evaluation templates keyed by the SHA-256 of the skills sheet, so an unchanged
+# sheet is read once per process rather than once per resume or per /process_data
+evaluation_templates = {}
+evaluation_templates_lock = threading.Lock()
+
+def load_evaluation_template(skills_file):
+    if isinstance(skills_file, EvaluationTemplate):
+        return skills_file
+
+    digest = file_digest(skills_file)
+    with evaluation_templates_lock:
+        template = evaluation_templates.get(digest)
+    if template is None:
+        template = EvaluationTemplate(load_skills(skills_file), digest)
+        with evaluation_templates_lock:
+            evaluation_templates[digest] = template
+    return template
+
+def extract_skills(resume_text, skills_file, model=None):
+    template = load_evaluation_template(skills_file)
 
     # Sending a single request to the model for all skills
-    prompt = ChatPromptTemplate.from_template(prompt_template)
-    chain = prompt | model
-    skills_response = chain.invoke({'resume_text': resume_text, 'skills_prompt':skills_prompt})
-
-    # Parse the model response to extract skill-based observations
-    for skill in skills:
-        # Search for the evaluation of each skill in the response
-        skill_pattern = rf"{re.escape(skill)}:?\s*(.*)"
-        skill_match = re.search(skill_pattern, skills_response, re.IGNORECASE)
-        
-        # Assign the extracted observation to the skill, or 'Not mentioned' if not found
-        extracted_data[skill] = skill_match.group(1).strip() if skill_match else "Not mentioned"
-    
-    return extracted_data
-
-
-
-def pdfs_to_cleaned_and_extracted_excel(resume_folder, job_description_file, skills_file, final_excel_path, model=model):
-
-    if os.path.exists(final_excel_path):
-        df_existing = pd.read_excel(final_excel_path)
-        processed_files = set(df_existing['Filename'].tolist())
-    else:
-        df_existing = pd.DataFrame()
-        processed_files = set()
+    skills_response = invoke_prompt('skills', {'skills_prompt': template.skills_prompt, 'resume_text': resume_text}, model=model)
+    return template.parse_skills(skills_response)
 
-    all_extracted_data = []
-    job_description_text = "\n".join(extract_text_from_file(job_description_file))
+async def aextract_score(resume_text, job_description, model=None, semaphore=None):
+    if not resume_text:
+        return parse_score("")
 
-    start_time = time.time()
-    processed_file_count = 0  # Initialize a counter
-    for filename in os.listdir(resume_folder):
+    response = await ainvoke_prompt('score', {
+        'job_description': job_description,
+        'resume_text': resume_text,
+    }, model=model, semaphore=semaphore)
+    return parse_score(response)
 
-        print("\nProcessing: {filename}".format(filename=filename))
+async def aextract_bulk_info_llm(resume_text, model=None, semaphore=None, contacts=None):
+    if not resume_text:
+        return apply_contacts(parse_bulk_info(""), contacts)
 
-        # Increment the processed file count
-        processed_file_count += 1
+    response = await ainvoke_prompt('bulk_info', {
+        **bulk_info_inputs(bulk_info_fields(contacts)),
+        'resume_text': resume_text,
+    }, model=model, semaphore=semaphore)
+    return apply_contacts(parse_bulk_info(response), contacts)
+
+async def aextract_skills(resume_text, skills_file, model=None, semaphore=None):
+    # Keep a possible Excel read off the event loop
+    template = await asyncio.to_thread(load_evaluation_template, skills_file)
+
+    skills_response = await ainvoke_prompt('skills', {'skills_prompt': template.skills_prompt, 'resume_text': resume_text},
+                                           model=model, semaphore=semaphore)
+    return template.parse_skills(skills_response)
+
+def parse_single_pass(response, skills):
+    from pydantic import ValidationError
+    from schemas import ResumeEvaluation
+
+    try:
+        evaluation = ResumeEvaluation.model_validate_json(response)
+    except ValidationError as e:
+        print(f"-- Single-pass response could not be validated: {e.errors()[0]['msg']}")
+        evaluation = ResumeEvaluation()
+
+    extracted_info = {
+        "Name": evaluation.name,
+        "Location": evaluation.location,
+        "Phone": evaluation.phone,
+        "Experience": evaluation.experience,
+        "Fitment Summary": evaluation.fitment_summary,
+    }
+    score = evaluation.score if evaluation.score is not None else "Not generated"
 
+    # Map the returned skills back onto the sheet's spelling so the columns stay stable
+    returned_skills = {skill.strip().lower(): text.strip() for skill, text in evaluation.skills.items()}
+    skills_data = {skill: returned_skills.get(str(skill).strip().lower()) or "Not mentioned" for skill in skills}
 
-        if filename in processed_files:
-            continue  # Skip already processed files
+    return extracted_info, score, skills_data
 
-        if filename.endswith(".pdf"):
-            model = OllamaLLM(model="phi3")  # Reinitialize the model to reset its memory
-            file_path = os.path.join(resume_folder, filename)
+def single_pass_inputs(resume_text, job_description, template):
+    return {
+        'job_description': job_description,
+        'skills_list': template.skills_list,
+        'resume_text': resume_text,
+    }
 
-            # Extract text from the current file
-            resume_text = extract_text_from_file(file_path)
+def extract_single_pass(resume_text, job_description, skills_file, model=None):
+    # One JSON-mode call replacing the bulk-info, role/score and skills prompts
+    model = model or get_llm(json_mode=True)
+    template = load_evaluation_template(skills_file)
+    if not resume_text:
+        return parse_single_pass("{}", template.skills)
 
-            # Extract name, location, phone, experience, and fitment summary in bulk
-            extracted_info = extract_bulk_info_llm(resume_text, model=model)
-            print(f"-- Info Extracted")
+    response = invoke_prompt('single_pass', single_pass_inputs(resume_text, job_description, template), model=model)
+    return parse_single_pass(response, template.skills)
 
-            extracted_data = extract_role_score(resume_text, job_description_text, model=model)
-            print(f"-- Role Score Calculated")
+async def aextract_single_pass(resume_text, job_description, skills_file, model=None, semaphore=None):
+    model = model or get_async_llm(json_mode=True)
+    template = await asyncio.to_thread(load_evaluation_template, skills_file)
+    if not resume_text:
+        return parse_single_pass("{}", template.skills)
+
+    response = await ainvoke_prompt('single_pass', single_pass_inputs(resume_text, job_description, template),
+                                    model=model, semaphore=semaphore)
+    return parse_single_pass(response, template.skills)
+
+def parse_resume(file_path, backend=None):
+    # CPU-bound stage: PDF/DOCX parsing, link and contact extraction and prompt contexts, no LLM calls
+    document = load_document(file_path, backend=backend)
+    github_links, linkedin_links = split_links(document["links"])
+    # Contacts and section headings are read from the raw text: cleaning drops stopwords and line breaks
+    contexts, context_tokens = build_contexts(document["raw_text"])
+    return {
+        "text": document["cleaned_text"],
+        "github_links": github_links,
+        "linkedin_links": linkedin_links,
+        "contacts": extract_contacts(document["raw_text"]),
+        # Token-budgeted resume text per prompt (see sections.STAGE_SECTIONS)
+        "contexts": contexts,
+        "context_tokens": context_tokens,
+    }
 
+def log_context_tokens(filename, parsed_resume, stages):
+    tokens = parsed_resume["context_tokens"]
+    print(f"-- {filename}: Resume tokens " + ", ".join(f"{stage} {tokens[stage]}" for stage in stages))
+
+def screen_resume(filename, parsed_resume, job_profile, evaluation_template, model=None, single_pass=False):
+    contexts, contacts = parsed_resume["contexts"], parsed_resume["contacts"]
+    github_links, linkedin_links = parsed_resume["github_links"], parsed_resume["linkedin_links"]
+
+    if single_pass:
+        log_context_tokens(filename, parsed_resume, ("single_pass",))
+        extracted_info, score, skills_data = extract_single_pass(contexts["single_pass"], job_profile.text, evaluation_template, model=model)
+        apply_contacts(extracted_info, contacts)
+        print(f"-- {filename}: Single-pass Evaluation Extracted")
+        return build_row(filename, extracted_info, job_profile.role, score, skills_data, github_links, linkedin_links)
+
+    # Extract name, location, phone, experience, and fitment summary in bulk
+    log_context_tokens(filename, parsed_resume, ("bulk_info", "score", "skills"))
+    extracted_info = extract_bulk_info_llm(contexts["bulk_info"], model=model, contacts=contacts)
+    print(f"-- {filename}: Info Extracted")
+
+    score = extract_score(contexts["score"], job_profile.text, model=model)
+    print(f"-- {filename}: Score Calculated")
+
+    skills_data = extract_skills(contexts["skills"], evaluation_template, model=model)
+    print(f"-- {filename}: Skills Extracted")
+
+    # Every row carries the role inferred once from the job description
+    return build_row(filename, extracted_info, job_profile.role, score, skills_data, github_links, linkedin_links)
+
+def screen_resume_group(resumes, job_profile, evaluation_template, model=None, single_pass=False):
+    # Rows for a list of (filename, parsed resume). Ollama serving one request at a time only keeps
+    # the KV cache of the previous prompt, so the bulk info prompts of all resumes go first, then
+    # the score prompts, then the skills prompts: each request shares its template's instructions
+    # and job inputs with the one before, where screening resume by resume switches template on
+    # every request and prefills every prompt in full.
+    if single_pass:
+        # One template per resume, so consecutive requests already share their prefix
+        return [screen_resume(filename, parsed_resume, job_profile, evaluation_template, model=model, single_pass=True)
+                for filename, parsed_resume in resumes]
+
+    for filename, parsed_resume in resumes:
+        log_context_tokens(filename, parsed_resume, ("bulk_info", "score", "skills"))
+    extracted_infos = [extract_bulk_info_llm(parsed_resume["contexts"]["bulk_info"], model=model, contacts=parsed_resume["contacts"])
+                       for _, parsed_resume in resumes]
+    print(f"-- {len(resumes)} resumes: Info Extracted")
+    scores = [extract_score(parsed_resume["contexts"]["score"], job_profile.text, model=model) for _, parsed_resume in resumes]
+    print(f"-- {len(resumes)} resumes: Score Calculated")
+    skills = [extract_skills(parsed_resume["contexts"]["skills"], evaluation_template, model=model) for _, parsed_resume in resumes]
+    print(f"-- {len(resumes)} resumes: Skills Extracted")
+
+    return [build_row(filename, extracted_info, job_profile.role, score, skills_data, parsed_resume["github_links"], parsed_resume["linkedin_links"])
+            for (filename, parsed_resume), extracted_info, score, skills_data in zip(resumes, extracted_infos, scores, skills)]
+
+async def ascreen_resume(filename, parsed_resume, job_profile, evaluation_template, model=None, semaphore=None, single_pass=False):
+    contexts, contacts = parsed_resume["contexts"], parsed_resume["contacts"]
+    github_links, linkedin_links = parsed_resume["github_links"], parsed_resume["linkedin_links"]
+    model = model or get_async_llm(json_mode=single_pass)
+
+    if single_pass:
+        log_context_tokens(filename, parsed_resume, ("single_pass",))
+        extracted_info, score, skills_data = await aextract_single_pass(contexts["single_pass"], job_profile.text, evaluation_template,
+                                                                        model=model, semaphore=semaphore)
+        apply_contacts(extracted_info, contacts)
+        print(f"-- {filename}: Single-pass Evaluation Extracted")
+        return build_row(filename, extracted_info, job_profile.role, score, skills_data, github_links, linkedin_links)
+
+    # The three prompts only depend on the resume text, so they can run side by side
+    log_context_tokens(filename, parsed_resume, ("bulk_info", "score", "skills"))
+    extracted_info, score, skills_data = await asyncio.gather(
+        aextract_bulk_info_llm(contexts["bulk_info"], model=model, semaphore=semaphore, contacts=contacts),
+        aextract_score(contexts["score"], job_profile.text, model=model, semaphore=semaphore),
+        aextract_skills(contexts["skills"], evaluation_template, model=model, semaphore=semaphore),
+    )
+    print(f"-- {filename}: Info, Score and Skills Extracted")
+
+    return build_row(filename, extracted_info, job_profile.role, score, skills_data, github_links, linkedin_links)
+
+def build_row(filename, extracted_info, role, score, skills_data, github_links, linkedin_links):
+    # Join links into comma-separated strings
+    github_links_str = ', '.join(github_links) if github_links else "Not mentioned"
+    linkedin_links_str = ', '.join(linkedin_links) if linkedin_links else "Not mentioned"
+
+    # Initialize a dictionary to store all extracted information
+    extracted_data = {
+        "Filename": filename,
+        "Name": extracted_info["Name"],
+        "Location": extracted_info["Location"],
+        "Phone": extracted_info["Phone"],
+        "Email": extracted_info.get("Email", "Not mentioned"),
+        "Github Links": github_links_str,
+        "LinkedIn Links": linkedin_links_str,
+        "Total Experience": extracted_info["Experience"],
+        "Fitment Summary": extracted_info["Fitment Summary"],
+        "Score": score,
+        "Role": role,
+    }
 
-            # Extract GitHub and LinkedIn links
-            github_links, linkedin_links = extract_links(file_path)
-            print("-- Links extracted")
+    extracted_data.update(skills_data)
+    return extracted_data
 
-            # Join links into comma-separated strings
-            github_links_str = ', '.join(github_links) if github_links else "Not mentioned"
-            linkedin_links_str = ', '.join(linkedin_links) if linkedin_links else "Not mentioned"
+def build_filtered_row(filename, parsed_resume, similarity, evaluation_template):
+    # Placeholder row for a resume the pre-filter kept away from the LLM; recording it means
+    # later runs do not pick it up again
+    github_links, linkedin_links = parsed_resume["github_links"], parsed_resume["linkedin_links"]
+    extracted_info = apply_contacts({
+        "Name": "Not evaluated",
+        "Location": "Not evaluated",
+        "Phone": "Not evaluated",
+        "Experience": "Not evaluated",
+        "Fitment Summary": f"Skipped by the pre-filter (similarity {similarity:.3f} to the job description)",
+    }, parsed_resume["contacts"])
+    skills_data = {skill: "Not evaluated" for skill in evaluation_template.skills}
+    return build_row(filename, extracted_info, "Filtered out", "Filtered out", skills_data, github_links, linkedin_links)
+
+def prefilter_resumes(resume_folder, pending_files, job_description_text, top_k=None, threshold=None, parse_workers=1, pdf_backend=None):
+    # Cheap first stage: ranks every pending resume against the job description and returns
+    # (similarity per filename, files to screen, parsed resumes of the files left out).
+    # The parses land in the text cache, so the LLM stage does not pay for them again.
+    paths = [os.path.join(resume_folder, filename) for filename in pending_files]
+    if parse_workers > 1:
+        with ProcessPoolExecutor(max_workers=parse_workers) as parse_pool:
+            parsed_resumes = list(parse_pool.map(parse_resume, paths, [pdf_backend] * len(paths)))
+    else:
+        parsed_resumes = [parse_resume(path, backend=pdf_backend) for path in paths]
+
+    scores = similarity_scores(job_description_text, [parsed_resume["text"] for parsed_resume in parsed_resumes])
+    keep = select_candidates(scores, top_k=top_k, threshold=threshold)
+
+    similarities = {filename: float(score) for filename, score in zip(pending_files, scores)}
+    selected_files = [filename for filename, kept in zip(pending_files, keep) if kept]
+    filtered_out = {filename: parsed_resume for filename, parsed_resume, kept in zip(pending_files, parsed_resumes, keep) if not kept}
+    print(f"Pre-filter ({embedding_backend()}): {len(selected_files)} of {len(pending_files)} resumes go to the LLM")
+    return similarities, selected_files, filtered_out
+
+def find_job_files(upload_folder):
+    # The job description (.txt) and skills sheet (.xlsx) currently uploaded, or None for a missing one
+    job_description_path, eval_template_path = None, None
+    for file_name in os.listdir(upload_folder) if os.path.isdir(upload_folder) else []:
+        if file_name.endswith('.txt'):
+            job_description_path = os.path.join(upload_folder, file_name)
+        if file_name.endswith('.xlsx'):
+            eval_template_path = os.path.join(upload_folder, file_name)
+    return job_description_path, eval_template_path
+
+def open_results_store(final_excel_path):
+    store = ResultsStore(results_store_path(final_excel_path))
+    # Carry over rows from a workbook produced before the store existed
+    if not store.exists() and os.path.exists(final_excel_path):
+        store.import_excel(final_excel_path)
+    return store
+
+def materialize_excel(final_excel_path):
+    # Brings the .xlsx up to date with the results store, e.g. before /download
+    return open_results_store(final_excel_path).materialize(final_excel_path)
+
+async def screen_resumes_async(resume_folder, pending_files, job_profile, evaluation_template, parse_workers, llm_workers, on_row, single_pass=False, pdf_backend=None, model=None):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max(1, llm_workers))
+    # One pooled async client for the whole batch
+    model = model or get_async_llm(json_mode=single_pass)
+
+    with ProcessPoolExecutor(max_workers=max(1, parse_workers)) as parse_pool:
+        async def screen(filename):
+            parsed_resume = await loop.run_in_executor(parse_pool, parse_resume, os.path.join(resume_folder, filename), pdf_backend)
+            print("\nParsed: {filename}".format(filename=filename))
+            return await ascreen_resume(filename, parsed_resume, job_profile, evaluation_template,
+                                        model=model, semaphore=semaphore, single_pass=single_pass)
+
+        tasks = [asyncio.ensure_future(screen(filename)) for filename in pending_files]
+
+        # Await in listing order so rows come out in the same order as the serial path
+        for task in tasks:
+            extracted_data = await task
+            await loop.run_in_executor(None, on_row, extracted_data)
+
+def pdfs_to_cleaned_and_extracted_excel(resume_folder, job_description_file, skills_file, final_excel_path, model=None, parse_workers=1, llm_workers=1, use_async=False, single_pass=False, pdf_backend=None, progress_callback=None,
+                                        prefilter_top_k=None, prefilter_threshold=None, filenames=None, materialize=True):
+
+    store = open_results_store(final_excel_path)
+    stored_entries = store.entries()
+
+    # Process the job description once per batch (and once per content across batches)
+    # (the role prompt expects plain text, so it never goes to the JSON-mode model)
+    job_profile = load_job_profile(job_description_file, model=None if single_pass else model)
+    print("Job description: role {role}, {tokens} tokens, keywords {keywords}".format(**job_profile.to_dict()))
+    # Parse the skills sheet once for the whole batch; every worker shares the same template
+    evaluation_template = load_evaluation_template(skills_file)
+
+    # Everything besides the resume that decides a row
+    context = ScreeningContext(job_profile.digest or '', evaluation_template.digest or '',
+                               model_name(model or get_llm(json_mode=single_pass)), prompt_versions(SCREENING_PROMPTS[single_pass]))
+    stored_context = context_key(context)
+
+    # Resumes are known by content. A file is skipped when its row in the store is for the same
+    # content and context, its row is copied when the content was screened under this context
+    # before (under any name), and only the rest is screened, once per distinct content.
+    # filenames limits the run to a batch of the folder, e.g. the files the folder watcher just queued
+    if filenames is None:
+        filenames = os.listdir(resume_folder)
+    filenames = [filename for filename in filenames if filename.lower().endswith(RESUME_EXTENSIONS) and os.path.isfile(os.path.join(resume_folder, filename))]
+    digests = resume_registry.digests(resume_folder, filenames)
+    pending_files, reused_rows, copies = [], [], {}
+    for filename in filenames:
+        digest = digests[filename]
+        # Rows stored before digests were recorded have neither and are matched by name
+        if stored_entries.get(filename) in ((digest, stored_context), (None, None)):
+            continue
+        previous_row = resume_registry.screened(digest, context)
+        if previous_row is not None:
+            reused_rows.append(dict(previous_row, Filename=filename))
+        elif digest in copies:
+            copies[digest].append(filename)
+        else:
+            copies[digest] = []
+            pending_files.append(filename)
+
+    screened = []
+    total = len(pending_files) + len(reused_rows) + sum(len(names) for names in copies.values())
+    similarities = {}
+
+    def record(extracted_data, register=True, row_context=stored_context):
+        # row_context is the context the stored row is skipped under on later runs
+        filename = extracted_data["Filename"]
+        digest = digests[filename]
+        if register:
+            resume_registry.record(digest, context, extracted_data)
+        if filename in similarities:
+            extracted_data["Similarity"] = round(similarities[filename], 4)
+        # Save progress after each resume with a single-row write
+        store.replace(extracted_data, digest, row_context)
+        screened.append(filename)
+        if progress_callback:
+            progress_callback(len(screened), total, filename)
+        # The same content under other names in this batch gets the same row
+        for copy in copies.pop(digest, []):
+            record(dict(extracted_data, Filename=copy), register=False, row_context=row_context)
+
+    if progress_callback:
+        progress_callback(0, total)
+    if reused_rows:
+        print(f"Reusing {len(reused_rows)} rows of resumes screened before under other names or in earlier runs")
+    for row in reused_rows:
+        record(row, register=False)
 
-            # Initialize a dictionary to store all extracted information
-            extracted_data = {
-                "Filename": filename,
-                "Name": extracted_info["Name"],
-                "Location": extracted_info["Location"],
-                "Phone": extracted_info["Phone"],
-                "Github Links": github_links_str,
-                "LinkedIn Links": linkedin_links_str,
-                "Total Experience": extracted_info["Experience"],
-                "Fitment Summary": extracted_info["Fitment Summary"],
-                "Score": extracted_data["Score"],
-                "Role": extracted_data["Role"],
+    start_time = time.time()
+    if pending_files and (prefilter_top_k or prefilter_threshold is not None):
+        # Only the resumes closest to the job description get the full LLM treatment
+        similarities, pending_files, filtered_out = prefilter_resumes(
+            resume_folder, pending_files, job_profile.text, top_k=prefilter_top_k, threshold=prefilter_threshold,
+            parse_workers=parse_workers, pdf_backend=pdf_backend,
+        )
+        for filename, parsed_resume in filtered_out.items():
+            # The pre-filter depends on the batch, so its placeholder rows are not kept for reuse and
+            # are stored without a context: a later run without the pre-filter, or with one that
+            # lets the resume through, screens it instead of skipping it
+            record(build_filtered_row(filename, parsed_resume, similarities[filename], evaluation_template),
+                   register=False, row_context=None)
+
+    if not use_async:
+        # Every resume shares one pooled client; the model keeps no state between calls
+        model = model or get_llm(json_mode=single_pass)
+
+    if use_async:
+        # One event loop fans out the three prompts of every resume, bounded by llm_workers
+        asyncio.run(screen_resumes_async(resume_folder, pending_files, job_profile, evaluation_template,
+                                         parse_workers, llm_workers, record, single_pass=single_pass, pdf_backend=pdf_backend,
+                                         model=model))
+    elif parse_workers <= 1 and llm_workers <= 1:
+        # Screened a group at a time so consecutive prompts share their prefix (see screen_resume_group)
+        for start in range(0, len(pending_files), max(1, PROMPT_GROUP_SIZE)):
+            resumes = []
+            for filename in pending_files[start:start + max(1, PROMPT_GROUP_SIZE)]:
+                print("\nProcessing: {filename}".format(filename=filename))
+                resumes.append((filename, parse_resume(os.path.join(resume_folder, filename), backend=pdf_backend)))
+                print("-- Text and links extracted")
+
+            for row in screen_resume_group(resumes, job_profile, evaluation_template, model=model, single_pass=single_pass):
+                record(row)
+    else:
+        # Parsing is CPU-bound and goes to a process pool, while the LLM stage is I/O-bound
+        # and goes to a thread pool whose size caps the number of in-flight model requests
+        with ProcessPoolExecutor(max_workers=max(1, parse_workers)) as parse_pool, \
+                ThreadPoolExecutor(max_workers=max(1, llm_workers)) as llm_pool:
+            parse_futures = {
+                parse_pool.submit(parse_resume, os.path.join(resume_folder, filename), pdf_backend): index
+                for index, filename in enumerate(pending_files)
             }
 
-            skills_data = extract_skills(resume_text, skills_file, model=model)
-            print("-- Skills Extracted")
-
-            # Append the extracted data to the list
-            extracted_data.update(skills_data)
-            all_extracted_data.append(extracted_data)
-
-            # Save progress after each resume
-            df_progress = pd.DataFrame(all_extracted_data)
-            df_combined = pd.concat([df_existing, df_progress], ignore_index=True)
-            df_combined.to_excel(final_excel_path, index=False)
+            # Hand each resume to the LLM pool as soon as its parse finishes
+            screen_futures = [None] * len(pending_files)
+            for parse_future in as_completed(parse_futures):
+                index = parse_futures[parse_future]
+                filename = pending_files[index]
+                print("\nParsed: {filename}".format(filename=filename))
+                screen_futures[index] = llm_pool.submit(
+                    screen_resume, filename, parse_future.result(), job_profile, evaluation_template,
+                    model,
+                    single_pass,
+                )
+
+            # Collect rows in listing order so the output matches the serial path
+            for screen_future in screen_futures:
+                record(screen_future.result())
+
+    # Materialize the workbook once, now that the batch is complete
+    if materialize:
+        store.materialize(final_excel_path)
 
     end_time = time.time()
     time_taken = end_time - start_time
     print(f"Time Taken in process: {time_taken} seconds.")
+    print("LLM cache: {hits} hits, {misses} misses".format(**llm_cache.stats()))
+    for template_id, stats in prefill_stats.summary().items():
+        print("Prefill {}: {calls} calls, {avg_prompt_tokens} prompt tokens and {avg_prefill_ms} ms on average".format(template_id, **stats))
 
 # Example usage
 if __name__ == "__main__":